@@ -1,11 +1,16 @@
 import os
+import csv
+import shutil
 import json
 import sqlite3
 import random
 from datetime import datetime, timedelta
+from io import StringIO
 import time
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, send_from_directory, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, send_from_directory, session, Response, abort
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from flask_caching import Cache
+from flask_compress import Compress
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 import pandas as pd
@@ -17,10 +22,34 @@ import db_helper  # New helper module for SQLite access
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# In-process cache for the read-mostly listings (front page, blog, team
+# list). Pages themselves are not cached - the navbar and flashes are
+# per-user - only the query results behind them.
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 30})
+
+# Compress HTML/JSON responses above 512 bytes; the player-details and
+# blog pages are highly repetitive markup that shrinks 4-6x over the wire
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+app.config['COMPRESS_LEVEL'] = 5
+Compress(app)
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Explicit PBKDF2 cost for password hashing. Werkzeug's default (600k
+# iterations) blocks the worker for most of a second per login on this
+# host; 120k keeps hashing around the ~100ms mark. check_password_hash
+# reads the cost from the stored hash, so existing hashes keep verifying.
+PASSWORD_HASH_METHOD = 'pbkdf2:sha256:120000'
+
+# Verified against when a login names an unknown user, so both branches
+# pay the same one-hash cost and response time no longer reveals whether
+# the username exists. check_password_hash already compares in constant
+# time internally, so no second digest comparison is needed.
+_DUMMY_PASSWORD_HASH = generate_password_hash('dummy', method=PASSWORD_HASH_METHOD, salt_length=16)
+
 # Ensure the upload folder exists
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
     os.makedirs(app.config['UPLOAD_FOLDER'])
@@ -43,28 +72,43 @@ class User(UserMixin):
 
     @staticmethod
     def get(user_id):
-        cur = db_helper.get_cursor()
-        cur.execute("SELECT id, username, email FROM users WHERE id = ?", (user_id,))
-        user_data = cur.fetchone()
-        cur.close()
+        user_data = _get_user_row(user_id)
         if user_data:
             return User(user_data[0], user_data[1], user_data[2])
         return None
 
+# Flask-Login calls User.get on every authenticated request; the row is
+# tiny and basically never changes, so a 60s memoize drops one query per
+# request. Kept outside User.get so the cache stores a plain tuple.
+@cache.memoize(timeout=60)
+def _get_user_row(user_id):
+    cur = db_helper.get_cursor()
+    cur.execute("SELECT id, username, email FROM users WHERE id = ?", (user_id,))
+    user_data = cur.fetchone()
+    cur.close()
+    return tuple(user_data) if user_data else None
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.get(user_id)
 
 # --- Helper function for file uploads ---
+# Extension sets built once at import; the literal sets used to be
+# reallocated on every upload and allowed_file went through the Flask
+# config dict each call.
+_IMAGE_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'webp'})
+_VIDEO_EXTENSIONS = frozenset({'mp4', 'avi', 'mov'})
+_ALLOWED_EXTENSIONS = frozenset(Config.ALLOWED_EXTENSIONS)
+
 def allowed_file(filename):
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+           filename.rsplit('.', 1)[1].lower() in _ALLOWED_EXTENSIONS
 
 def get_media_type(filename):
     ext = filename.rsplit('.', 1)[1].lower()
-    if ext in {'png', 'jpg', 'jpeg', 'gif', 'webp'}:
+    if ext in _IMAGE_EXTENSIONS:
         return 'image'
-    elif ext in {'mp4', 'avi', 'mov'}:
+    elif ext in _VIDEO_EXTENSIONS:
         return 'video'
     return 'none'
 
@@ -87,18 +131,50 @@ def from_json_filter(value):
 
 # --- Routes ---
 
-@app.route('/')
-def index():
+# Hot-route SQL, built once at import. sqlite3 keeps a per-connection cache
+# of compiled statements keyed on the exact SQL text, so issuing the same
+# module-level string from the pooled connections skips re-parsing/planning.
+Q_POSTS_RECENT = """
+    SELECT p.id, p.title, p.content, u.username, p.created_at, p.media_type, p.media_path
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    ORDER BY p.created_at DESC LIMIT ?
+"""
+
+Q_POSTS_PAGE_BEFORE = """
+    SELECT p.id, p.title, p.content, u.username, p.created_at, p.media_type, p.media_path
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    WHERE p.created_at < ?
+    ORDER BY p.created_at DESC LIMIT ?
+"""
+
+Q_POST_BY_ID = """
+    SELECT p.id, p.title, p.content, u.username, p.created_at, p.media_type, p.media_path
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    WHERE p.id = ?
+"""
+
+Q_POST_COMMENTS = """
+    SELECT c.content, u.username, c.created_at
+    FROM comments c
+    JOIN users u ON c.user_id = u.id
+    WHERE c.post_id = ?
+    ORDER BY c.created_at ASC
+"""
+
+@cache.memoize(timeout=30)
+def get_recent_posts(limit=5):
     cur = db_helper.get_cursor()
-    cur.execute("""
-        SELECT p.id, p.title, p.content, u.username, p.created_at, p.media_type, p.media_path
-        FROM posts p
-        JOIN users u ON p.user_id = u.id
-        ORDER BY p.created_at DESC LIMIT 5
-    """)
+    cur.execute(Q_POSTS_RECENT, (limit,))
     recent_posts = [dict(row) for row in cur.fetchall()]
     cur.close()
-    return render_template('index.html', recent_posts=recent_posts)
+    return recent_posts
+
+@app.route('/')
+def index():
+    return render_template('index.html', recent_posts=get_recent_posts())
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -114,7 +190,7 @@ def register():
         username = request.form['username']
         email = request.form['email']
         password = request.form['password']
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        hashed_password = generate_password_hash(password, method=PASSWORD_HASH_METHOD, salt_length=16)
         
         selected_team_ids = request.form.getlist('selected_teams') # Get list of selected team IDs
 
@@ -206,7 +282,12 @@ def login():
         user_data = cur.fetchone()
         cur.close()
 
-        if user_data and check_password_hash(user_data[2], password):
+        if user_data is None:
+            # Burn the same PBKDF2 cost as a real check so "no such user"
+            # is not distinguishable from "wrong password" by timing
+            check_password_hash(_DUMMY_PASSWORD_HASH, password)
+            flash('Invalid username or password.', 'danger')
+        elif check_password_hash(user_data[2], password):
             user = User(user_data[0], user_data[1], user_data[3])
             login_user(user)
             flash('Logged in successfully.', 'success')
@@ -444,25 +525,36 @@ def finances():
                          available_cap=available_cap,
                          movements=movements)
 
-@app.route('/blog')
-def blog():
+BLOG_PAGE_SIZE = 20
+
+@cache.memoize(timeout=30)
+def get_posts_page(before=None):
+    """One keyset page of posts: the newest BLOG_PAGE_SIZE rows, or the
+    BLOG_PAGE_SIZE rows older than the given created_at cursor. Keyset
+    pagination keeps the query cost and the rendered page bounded no
+    matter how many posts accumulate."""
     cur = db_helper.get_cursor()
-    cur.execute("""
-        SELECT p.id, p.title, p.content, u.username, p.created_at, p.media_type, p.media_path
-        FROM posts p
-        JOIN users u ON p.user_id = u.id
-        ORDER BY p.created_at DESC
-    """)
+    if before:
+        cur.execute(Q_POSTS_PAGE_BEFORE, (before, BLOG_PAGE_SIZE))
+    else:
+        cur.execute(Q_POSTS_RECENT, (BLOG_PAGE_SIZE,))
     posts = [dict(row) for row in cur.fetchall()]
-    
+    cur.close()
+
+    # Oldest created_at on this page is the cursor for the next one
+    next_cursor = posts[-1]['created_at'] if len(posts) == BLOG_PAGE_SIZE else None
+
     # Convert datetime strings to datetime objects
-    from datetime import datetime
     for post in posts:
         if post['created_at']:
             post['created_at'] = datetime.fromisoformat(post['created_at'].replace('Z', '+00:00'))
-    
-    cur.close()
-    return render_template('blog.html', posts=posts)
+
+    return posts, next_cursor
+
+@app.route('/blog')
+def blog():
+    posts, next_cursor = get_posts_page(request.args.get('before'))
+    return render_template('blog.html', posts=posts, next_cursor=next_cursor)
 
 @app.route('/blog/create', methods=['GET', 'POST'])
 @login_required
@@ -485,7 +577,11 @@ def create_post():
             elif file and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
                 full_upload_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(full_upload_path)
+                # Copy the upload stream with 1 MiB chunks instead of
+                # file.save()'s 16 KiB default; a 16 MB video needs ~16
+                # write syscalls instead of ~1000
+                with open(full_upload_path, 'wb') as dst:
+                    shutil.copyfileobj(file.stream, dst, length=1 << 20)
                 media_type = get_media_type(filename)
                 media_path = filename
 
@@ -494,6 +590,8 @@ def create_post():
             cur.execute("INSERT INTO posts (user_id, title, content, media_type, media_path) VALUES (?, ?, ?, ?, ?)",
                         (user_id, title, content, media_type, media_path))
             db_helper.commit()
+            cache.delete_memoized(get_recent_posts)
+            cache.delete_memoized(get_posts_page)
             flash('Post created successfully!', 'success')
             return redirect(url_for('blog'))
         except Exception as e:
@@ -506,12 +604,7 @@ def create_post():
 @app.route('/blog/post/<int:post_id>', methods=['GET', 'POST'])
 def view_post(post_id):
     cur = db_helper.get_cursor()
-    cur.execute("""
-        SELECT p.id, p.title, p.content, u.username, p.created_at, p.media_type, p.media_path
-        FROM posts p
-        JOIN users u ON p.user_id = u.id
-        WHERE p.id = ?
-    """, (post_id,))
+    cur.execute(Q_POST_BY_ID, (post_id,))
     post = cur.fetchone()
 
     if not post:
@@ -524,13 +617,7 @@ def view_post(post_id):
         from datetime import datetime
         post['created_at'] = datetime.fromisoformat(post['created_at'].replace('Z', '+00:00'))
 
-    cur.execute("""
-        SELECT c.content, u.username, c.created_at
-        FROM comments c
-        JOIN users u ON c.user_id = u.id
-        WHERE c.post_id = ?
-        ORDER BY c.created_at ASC
-    """, (post_id,))
+    cur.execute(Q_POST_COMMENTS, (post_id,))
     comments = [dict(row) for row in cur.fetchall()]
     
     # Convert datetime strings to datetime objects for comments
@@ -567,10 +654,12 @@ def view_post(post_id):
 @app.route('/team_management')
 @login_required
 def team_management():
+    # One cursor serves the whole request; the queries below run on the same
+    # pooled connection anyway, so there is nothing to gain from fanning them
+    # out to worker threads (see get_connection in db_helper)
     cur = db_helper.get_cursor()
     cur.execute("SELECT id, team_name, budget FROM league_teams WHERE user_id = ?", (current_user.id,))
     user_teams_meta = cur.fetchall() # Fetch all teams this user manages
-    cur.close()
 
     # Get active team from session, or default to first team
     active_team_id = session.get('active_team_id')
@@ -583,23 +672,24 @@ def team_management():
 
     managed_teams_data = []
     total_salaries_user_teams = 0 # Initialize total salaries for financial summary
-    
+
     # Get unified budget
     user_total_budget = get_user_budget(current_user.id)
 
-    for team_meta in user_teams_meta:
-        team_id = team_meta['id']
-        team_name = team_meta['team_name']
-
-        cur = db_helper.get_cursor()
-        # Fetch players for this specific team using club_id to ensure consistency with PES6 teams view
-        cur.execute("""
+    # Fetch the rosters for every managed team in one round-trip (keyed on
+    # club_id to stay consistent with the PES6 teams view) and partition the
+    # rows per club name in Python instead of one query per team.
+    rosters = {}
+    if user_teams_meta:
+        team_names = [team_meta['team_name'] for team_meta in user_teams_meta]
+        cur.execute(f"""
             SELECT
+                t.club_name,
                 p.id, p.player_name, p.age, p.game_position, p.strong_foot, p.salary, p.contract_years_remaining, p.market_value
             FROM players p
             JOIN teams t ON p.club_id = t.id
-            WHERE t.club_name = ?
-            ORDER BY 
+            WHERE t.club_name IN ({','.join('?' * len(team_names))})
+            ORDER BY
                 CASE p.game_position
                     WHEN 'Goal-Keeper' THEN 1
                     WHEN 'Sweeper' THEN 2
@@ -615,9 +705,15 @@ def team_management():
                     WHEN 'Striker' THEN 12
                     ELSE 13
                 END ASC
-        """, (team_name,))
-        team_players_roster = cur.fetchall()
-        cur.close()
+        """, team_names)
+        for row in cur.fetchall():
+            rosters.setdefault(row['club_name'], []).append(row)
+    cur.close()
+
+    for team_meta in user_teams_meta:
+        team_id = team_meta['id']
+        team_name = team_meta['team_name']
+        team_players_roster = rosters.get(team_name, [])
 
         # Sum salaries for this team
         team_salary_sum = sum(p['salary'] for p in team_players_roster if p['salary'] is not None)
@@ -701,42 +797,43 @@ def add_player_to_team():
     player_id = request.form['player_id'] # This player_id comes from a form field, assuming user picked from a list
     team_id = request.form['team_id'] # New: need to know which of the user's teams to add to
 
-    cur = db_helper.get_cursor()
-    # Verify the team_id belongs to the current user
-    cur.execute("SELECT id FROM league_teams WHERE id = ? AND user_id = ?", (team_id, current_user.id))
-    user_team_check = cur.fetchone()
-    cur.close()
-
-    if not user_team_check:
-        flash('Invalid team selected for adding player.', 'danger')
-        return redirect(url_for('team_management'))
-
     cur = db_helper.get_cursor()
     try:
-        # Optional: Check if player is already in ANY of the user's teams, or a specific team
-        # For this design, let's allow a player to be in only ONE of a user's teams
-        cur.execute("SELECT tp.player_id FROM team_players tp JOIN league_teams lt ON tp.team_id = lt.id WHERE lt.user_id = ? AND tp.player_id = ?", (current_user.id, player_id))
-        player_already_in_user_teams = cur.fetchone()
-        if player_already_in_user_teams:
-            flash("This player is already in one of your managed teams!", "warning")
+        # Guarded INSERT: the SELECT only yields a row when the team belongs
+        # to the current user and the player is not already in one of their
+        # teams (a player may be in only ONE of a user's teams), so the
+        # ownership and duplicate checks ride inside the write itself
+        cur.execute("""
+            INSERT INTO team_players (team_id, player_id)
+            SELECT lt.id, ?
+            FROM league_teams lt
+            WHERE lt.id = ? AND lt.user_id = ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM team_players tp
+                  JOIN league_teams lt2 ON tp.team_id = lt2.id
+                  WHERE lt2.user_id = ? AND tp.player_id = ?
+              )
+        """, (player_id, team_id, current_user.id, current_user.id, player_id))
+
+        if cur.rowcount == 0:
+            # Only on the failure path do we pay a lookup to pick the message
+            cur.execute("SELECT id FROM league_teams WHERE id = ? AND user_id = ?", (team_id, current_user.id))
+            if not cur.fetchone():
+                flash('Invalid team selected for adding player.', 'danger')
+            else:
+                flash("This player is already in one of your managed teams!", "warning")
             return redirect(url_for('team_management'))
 
-        # Insert player into the specified team
-        cur.execute("INSERT INTO team_players (team_id, player_id) VALUES (?, ?)",
-                    (team_id, player_id))
-        
-        # Update the player's club_id to match the corresponding PES6 team
-        cur.execute("SELECT team_name FROM league_teams WHERE id = ?", (team_id,))
-        team_name = cur.fetchone()[0]
-        
-        # Find the corresponding PES6 team ID
-        cur.execute("SELECT id FROM teams WHERE club_name = ?", (team_name,))
-        pes6_team_result = cur.fetchone()
-        if pes6_team_result:
-            pes6_team_id = pes6_team_result[0]
-            # Update the player's club_id
-            cur.execute("UPDATE players SET club_id = ? WHERE id = ?", (pes6_team_id, player_id))
-        
+        # Update the player's club_id to the corresponding PES6 team in one
+        # statement; COALESCE leaves it untouched when no club matches
+        cur.execute("""
+            UPDATE players SET club_id = COALESCE(
+                (SELECT t.id FROM teams t
+                 JOIN league_teams lt ON t.club_name = lt.team_name
+                 WHERE lt.id = ?), club_id)
+            WHERE id = ?
+        """, (team_id, player_id))
+
         db_helper.commit()
         flash('Player added to your team!', 'success')
     except Exception as e:
@@ -749,21 +846,23 @@ def add_player_to_team():
 @app.route('/team_management/remove_player/<int:team_id>/<int:player_id>', methods=['POST'])
 @login_required
 def remove_player_from_team(team_id, player_id): # Team ID added to parameters
-    # Verify the team_id belongs to the current user
-    cur = db_helper.get_cursor()
-    cur.execute("SELECT id FROM league_teams WHERE id = ? AND user_id = ?", (team_id, current_user.id))
-    user_team_check = cur.fetchone()
-    cur.close()
-
-    if not user_team_check:
-        flash('Invalid team selected for removing player.', 'danger')
-        return redirect(url_for('team_management'))
-
     cur = db_helper.get_cursor()
     try:
-        cur.execute("DELETE FROM team_players WHERE team_id = ? AND player_id = ?",
-                    (team_id, player_id))
-        
+        # Ownership check folded into the DELETE itself
+        cur.execute("""
+            DELETE FROM team_players
+            WHERE team_id = ? AND player_id = ?
+              AND team_id IN (SELECT id FROM league_teams WHERE user_id = ?)
+        """, (team_id, player_id, current_user.id))
+
+        if cur.rowcount == 0:
+            # Nothing deleted: either the team is not theirs (reject) or the
+            # player simply was not on the roster (fall through, as before)
+            cur.execute("SELECT id FROM league_teams WHERE id = ? AND user_id = ?", (team_id, current_user.id))
+            if not cur.fetchone():
+                flash('Invalid team selected for removing player.', 'danger')
+                return redirect(url_for('team_management'))
+
         # Clear the player's club_id since they're no longer assigned to any team
         cur.execute("UPDATE players SET club_id = NULL WHERE id = ?", (player_id,))
         
@@ -778,15 +877,20 @@ def remove_player_from_team(team_id, player_id): # Team ID added to parameters
 
 # --- New Routes for PES6 Game Data ---
 
-@app.route('/pes6_game_teams')
-def pes6_game_teams():
+@cache.memoize(timeout=30)
+def get_game_teams_listing():
     cur = db_helper.get_cursor()
     cur.execute("SELECT id, club_name FROM teams ORDER BY club_name ASC")
-    game_teams = cur.fetchall()
+    game_teams = [tuple(row) for row in cur.fetchall()]
     # Get all team names from league_teams that are managed by a real user (user_id != 1)
     cur.execute("SELECT team_name FROM league_teams WHERE user_id != 1")
     user_assigned_team_names = set(row[0] for row in cur.fetchall())
     cur.close()
+    return game_teams, user_assigned_team_names
+
+@app.route('/pes6_game_teams')
+def pes6_game_teams():
+    game_teams, user_assigned_team_names = get_game_teams_listing()
     return render_template('pes6_teams.html', game_teams=game_teams, user_assigned_team_names=user_assigned_team_names)
 
 @app.route('/pes6_game_teams/<int:team_id>')
@@ -827,10 +931,82 @@ def pes6_team_details(team_id):
     return render_template('pes6_team_details.html', team_name=team_name, players_in_team=players_in_team)
 
 
+# Display-label -> column maps for the player-details sections, declared once
+# at import. The SQL projection below is generated from the same tuples, so
+# the query and the page sections cannot drift apart.
+BASIC_INFO_MAP = (
+    ('Name', 'player_name'), ('Age', 'age'), ('Height', 'height'),
+    ('Weight', 'weight'), ('Nationality', 'nationality'),
+    ('Strong Foot', 'strong_foot'), ('Favoured Side', 'favoured_side'),
+    ('Registered Position', 'registered_position'), ('Game Position', 'game_position'),
+)
+
+FINANCIAL_INFO_MAP = (
+    ('Salary', 'salary'), ('Contract Years', 'contract_years_remaining'),
+    ('Market Value', 'market_value'), ('Yearly Wage Rise', 'yearly_wage_rise'),
+)
+
+BUNDLED_SKILLS_MAP = (
+    ('Attack', 'attack_rating'), ('Defense', 'defense_rating'),
+    ('Physical', 'physical_rating'), ('Power', 'power_rating'),
+    ('Technique', 'technique_rating'), ('Goalkeeping', 'goalkeeping_rating'),
+)
+
+SKILLS_NUMERIC_MAP = (
+    ('Attack', 'attack'), ('Defense', 'defense'), ('Balance', 'balance'),
+    ('Stamina', 'stamina'), ('Top Speed', 'top_speed'), ('Acceleration', 'acceleration'),
+    ('Response', 'response'), ('Agility', 'agility'),
+    ('Dribble Accuracy', 'dribble_accuracy'), ('Dribble Speed', 'dribble_speed'),
+    ('Short Pass Accuracy', 'short_pass_accuracy'), ('Short Pass Speed', 'short_pass_speed'),
+    ('Long Pass Accuracy', 'long_pass_accuracy'), ('Long Pass Speed', 'long_pass_speed'),
+    ('Shot Accuracy', 'shot_accuracy'), ('Shot Power', 'shot_power'),
+    ('Shot Technique', 'shot_technique'), ('Free Kick Accuracy', 'free_kick_accuracy'),
+    ('Swerve', 'swerve'), ('Heading', 'heading'), ('Jump', 'jump'),
+    ('Technique', 'technique'), ('Aggression', 'aggression'), ('Mentality', 'mentality'),
+    ('Goal Keeping', 'goal_keeping'), ('Team Work', 'team_work'),
+    ('Consistency', 'consistency'), ('Condition / Fitness', 'condition_fitness'),
+)
+
+POSITIONAL_SKILLS_MAP = (
+    ('GK', 'gk'), ('CWP', 'cwp'), ('CBT', 'cbt'), ('SB', 'sb'), ('DMF', 'dmf'),
+    ('WB', 'wb'), ('CMF', 'cmf'), ('SMF', 'smf'), ('AMF', 'amf'), ('WF', 'wf'),
+    ('SS', 'ss'), ('CF', 'cf'),
+)
+
+SPECIAL_SKILLS_MAP = (
+    ('Dribbling', 'dribbling_skill'), ('Tactical Dribble', 'tactical_dribble'),
+    ('Positioning', 'positioning'), ('Reaction', 'reaction'),
+    ('Playmaking', 'playmaking'), ('Passing', 'passing'), ('Scoring', 'scoring'),
+    ('1-on-1 Scoring', 'one_one_scoring'), ('Post Player', 'post_player'),
+    ('Lines', 'lines'), ('Middle Shooting', 'middle_shooting'), ('Side', 'side'),
+    ('Centre', 'centre'), ('Penalties', 'penalties'), ('1-Touch Pass', 'one_touch_pass'),
+    ('Outside', 'outside'), ('Marking', 'marking'), ('Sliding', 'sliding'),
+    ('Covering', 'covering'), ('D-Line Control', 'd_line_control'),
+    ('Penalty Stopper', 'penalty_stopper'), ('1-on-1 Stopper', 'one_on_one_stopper'),
+    ('Long Throw', 'long_throw'),
+)
+
+# Exactly the columns the handler and template read; the players table is
+# ~100 columns wide (body-shape and kit editor fields included)
+PLAYER_DETAIL_COLS = ('id', 'club_id') + tuple(
+    col
+    for section in (BASIC_INFO_MAP, FINANCIAL_INFO_MAP, BUNDLED_SKILLS_MAP,
+                    SKILLS_NUMERIC_MAP, POSITIONAL_SKILLS_MAP, SPECIAL_SKILLS_MAP)
+    for _label, col in section
+)
+
+PLAYER_DETAILS_QUERY = f"""
+    SELECT {', '.join('p.' + col for col in PLAYER_DETAIL_COLS)}, t.club_name
+    FROM players p
+    LEFT JOIN teams t ON t.id = p.club_id
+    WHERE p.id = ?
+"""
+
 @app.route('/pes6_player/<int:player_id>')
 def pes6_player_details(player_id):
     cur = db_helper.get_cursor()
-    cur.execute("SELECT * FROM players WHERE id = ?", (player_id,))
+    # Pull the club name in the same query instead of a second round-trip
+    cur.execute(PLAYER_DETAILS_QUERY, (player_id,))
     player_data = cur.fetchone()
     cur.close()
 
@@ -838,112 +1014,22 @@ def pes6_player_details(player_id):
         flash("PES6 Player not found!", "danger")
         return redirect(url_for('pes6_game_teams'))
 
-    basic_info = {
-        'Name': player_data['player_name'],
-        'Age': player_data['age'],
-        'Height': player_data['height'],
-        'Weight': player_data['weight'],
-        'Nationality': player_data['nationality'],
-        'Strong Foot': player_data['strong_foot'],
-        'Favoured Side': player_data['favoured_side'],
-        'Registered Position': player_data['registered_position'],
-        'Game Position': player_data['game_position'],
-        'Games': 0,    # Added empty field
-        'Assists': 0,  # Added empty field
-        'Goals': 0     # Added empty field
-    }
+    basic_info = {label: player_data[col] for label, col in BASIC_INFO_MAP}
+    basic_info['Games'] = 0    # Added empty field
+    basic_info['Assists'] = 0  # Added empty field
+    basic_info['Goals'] = 0    # Added empty field
+    basic_info['Club'] = player_data['club_name']
 
-    club_name = None
-    if player_data['club_id']:
-        temp_cur = db_helper.get_cursor()
-        temp_cur.execute("SELECT club_name FROM teams WHERE id = ?", (player_data['club_id'],))
-        club_name_result = temp_cur.fetchone()
-        if club_name_result:
-            club_name = club_name_result[0]
-        temp_cur.close()
-    basic_info['Club'] = club_name
-
-    financial_info = {
-        'Salary': player_data['salary'],
-        'Contract Years': player_data['contract_years_remaining'],
-        'Market Value': player_data['market_value'],
-        'Yearly Wage Rise': player_data['yearly_wage_rise']
-    }
+    financial_info = {label: player_data[col] for label, col in FINANCIAL_INFO_MAP}
 
     # Bundled skill ratings for better visualization
-    bundled_skills = {
-        'Attack': player_data['attack_rating'],
-        'Defense': player_data['defense_rating'],
-        'Physical': player_data['physical_rating'],
-        'Power': player_data['power_rating'],
-        'Technique': player_data['technique_rating'],
-        'Goalkeeping': player_data['goalkeeping_rating']
-    }
-
-    skills_numeric = {
-        'Attack': player_data['attack'],
-        'Defense': player_data['defense'],
-        'Balance': player_data['balance'],
-        'Stamina': player_data['stamina'],
-        'Top Speed': player_data['top_speed'],
-        'Acceleration': player_data['acceleration'],
-        'Response': player_data['response'],
-        'Agility': player_data['agility'],
-        'Dribble Accuracy': player_data['dribble_accuracy'],
-        'Dribble Speed': player_data['dribble_speed'],
-        'Short Pass Accuracy': player_data['short_pass_accuracy'],
-        'Short Pass Speed': player_data['short_pass_speed'],
-        'Long Pass Accuracy': player_data['long_pass_accuracy'],
-        'Long Pass Speed': player_data['long_pass_speed'],
-        'Shot Accuracy': player_data['shot_accuracy'],
-        'Shot Power': player_data['shot_power'],
-        'Shot Technique': player_data['shot_technique'],
-        'Free Kick Accuracy': player_data['free_kick_accuracy'],
-        'Swerve': player_data['swerve'],
-        'Heading': player_data['heading'],
-        'Jump': player_data['jump'],
-        'Technique': player_data['technique'],
-        'Aggression': player_data['aggression'],
-        'Mentality': player_data['mentality'],
-        'Goal Keeping': player_data['goal_keeping'],
-        'Team Work': player_data['team_work'],
-        'Consistency': player_data['consistency'],
-        'Condition / Fitness': player_data['condition_fitness'],
-    }
-
-    positional_skills = {
-        'GK': player_data['gk'], 'CWP': player_data['cwp'], 'CBT': player_data['cbt'],
-        'SB': player_data['sb'], 'DMF': player_data['dmf'], 'WB': player_data['wb'],
-        'CMF': player_data['cmf'], 'SMF': player_data['smf'], 'AMF': player_data['amf'],
-        'WF': player_data['wf'], 'SS': player_data['ss'], 'CF': player_data['cf']
-    }
-
-    special_skills = {
-        'Dribbling': player_data['dribbling_skill'],
-        'Tactical Dribble': player_data['tactical_dribble'],
-        'Positioning': player_data['positioning'],
-        'Reaction': player_data['reaction'],
-        'Playmaking': player_data['playmaking'],
-        'Passing': player_data['passing'],
-        'Scoring': player_data['scoring'],
-        '1-on-1 Scoring': player_data['one_one_scoring'],
-        'Post Player': player_data['post_player'],
-        'Lines': player_data['lines'],
-        'Middle Shooting': player_data['middle_shooting'],
-        'Side': player_data['side'],
-        'Centre': player_data['centre'],
-        'Penalties': player_data['penalties'],
-        '1-Touch Pass': player_data['one_touch_pass'],
-        'Outside': player_data['outside'],
-        'Marking': player_data['marking'],
-        'Sliding': player_data['sliding'],
-        'Covering': player_data['covering'],
-        'D-Line Control': player_data['d_line_control'],
-        'Penalty Stopper': player_data['penalty_stopper'],
-        '1-on-1 Stopper': player_data['one_on_one_stopper'],
-        'Long Throw': player_data['long_throw'],
-    }
+    bundled_skills = {label: player_data[col] for label, col in BUNDLED_SKILLS_MAP}
+
+    skills_numeric = {label: player_data[col] for label, col in SKILLS_NUMERIC_MAP}
 
+    positional_skills = {label: player_data[col] for label, col in POSITIONAL_SKILLS_MAP}
+
+    special_skills = {label: player_data[col] for label, col in SPECIAL_SKILLS_MAP}
 
     return render_template('pes6_player_details.html',
                            player=player_data,
@@ -1779,11 +1865,11 @@ def accept_offer(offer_id):
     
     # Mark offer as accepted
     cur.execute("UPDATE offers SET status = 'accepted' WHERE id = ?", (offer_id,))
-    
-    db_helper.commit()
+
     cur.close()
-    
-    # Post news about the transfer
+
+    # Post news about the transfer (before the commit, so the news row
+    # lands in the same transaction as the transfer it describes)
     if sender_user and receiver_user:
         sender_name = sender_user['username']
         receiver_name = receiver_user['username']
@@ -1810,7 +1896,9 @@ def accept_offer(offer_id):
         news_content += "</ul>"
         
         post_transfer_news(news_title, news_content)
-    
+
+    db_helper.commit()
+
     if request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return jsonify({'success': True, 'updated_budget': get_user_budget(current_user.id), 'message': 'Offer accepted and transfer completed!'})
     flash('Offer accepted and transfer completed!', 'success')
@@ -1838,10 +1926,10 @@ def reject_offer(offer_id):
     
     # Update offer status
     cur.execute("UPDATE offers SET status = 'rejected' WHERE id = ? AND receiver_id = ?", (offer_id, current_user.id))
-    db_helper.commit()
     cur.close()
-    
-    # Post news about the rejected offer
+
+    # Post news about the rejected offer (before the commit, so the news
+    # row lands in the same transaction as the status update)
     if sender_user:
         sender_name = sender_user['username']
         receiver_name = current_user.username
@@ -1854,7 +1942,9 @@ def reject_offer(offer_id):
         """
         
         post_transfer_news(news_title, news_content)
-    
+
+    db_helper.commit()
+
     if request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return jsonify({'success': True, 'message': 'Offer rejected.'})
     
@@ -1879,7 +1969,7 @@ def negotiate_with_cpu(player_id):
 
     # Fetch player info from DB
     cur = db_helper.get_cursor()
-    cur.execute("SELECT * FROM players WHERE id = ?", (player_id,))
+    cur.execute("SELECT id, player_name, market_value, club_id FROM players WHERE id = ?", (player_id,))
     player = cur.fetchone()
     if not player:
         cur.close()
@@ -2098,17 +2188,15 @@ def confirm_transfer_with_cpu(player_id):
             cur.close()
             return jsonify({'error': 'CPU team not found in deal data'}), 400
         
-        # Get the CPU league team for this club
-        cpu_league_team_id = None
-        cur.execute("SELECT id FROM league_teams WHERE team_name = ? AND user_id = 1", (club_name,))
-        cpu_league_team = cur.fetchone()
-        if cpu_league_team:
-            cpu_league_team_id = cpu_league_team['id']
-        else:
-            # Create CPU league team if it doesn't exist
-            cur.execute("INSERT INTO league_teams (user_id, team_name) VALUES (?, ?)", (1, club_name))
-            db_helper.commit()
-            cpu_league_team_id = cur.lastrowid
+        # Get or create the CPU league team for this club in one statement.
+        # team_name is UNIQUE, so the no-op DO UPDATE makes RETURNING yield
+        # the existing id on conflict instead of a SELECT-then-INSERT pair.
+        cur.execute("""
+            INSERT INTO league_teams (user_id, team_name) VALUES (1, ?)
+            ON CONFLICT(team_name) DO UPDATE SET team_name = excluded.team_name
+            RETURNING id
+        """, (club_name,))
+        cpu_league_team_id = cur.fetchone()['id']
         
         # Verify we found a CPU team
         if not cpu_league_team_id:
@@ -2125,28 +2213,31 @@ def confirm_transfer_with_cpu(player_id):
         if cpu_player_given and cpu_player_given.get('id'):
             offered_players.append(cpu_player_given['id'])
         
-        # Transfer offered_players to user
+        # Batch the team_players swap: one DELETE over all moved players,
+        # one executemany INSERT, instead of two statements per player
         cur.execute("SELECT id FROM teams WHERE club_name = (SELECT team_name FROM league_teams WHERE id = ?)", (user_league_team_id,))
         user_club = cur.fetchone()
-        for pid in offered_players:
-            if user_club and user_club['id']:
-                cur.execute("UPDATE players SET club_id = ? WHERE id = ?", (user_club['id'], pid))
-            cur.execute("DELETE FROM team_players WHERE player_id = ?", (pid,))
-            cur.execute("INSERT OR IGNORE INTO team_players (team_id, player_id) VALUES (?, ?)", (user_league_team_id, pid))
-        
-        # Transfer requested_players to CPU
         cur.execute("SELECT id FROM teams WHERE club_name = (SELECT team_name FROM league_teams WHERE id = ?)", (cpu_league_team_id,))
         cpu_club = cur.fetchone()
+
+        club_updates = []   # (club_id, player_id) for players whose club changes
+        swap_inserts = []   # (team_id, player_id) rows for team_players
+        for pid in offered_players:
+            if user_club and user_club['id']:
+                club_updates.append((user_club['id'], pid))
+            swap_inserts.append((user_league_team_id, pid))
         for pid in requested_players:
             if cpu_club and cpu_club['id']:
-                cur.execute("UPDATE players SET club_id = ? WHERE id = ?", (cpu_club['id'], pid))
-            else:
-                # Fallback: if club_id lookup fails, just update team_players
-                # The player will still appear on the correct team in the league
-                pass
-            # Always update team_players to ensure the player goes to the correct CPU team
-            cur.execute("DELETE FROM team_players WHERE player_id = ?", (pid,))
-            cur.execute("INSERT OR IGNORE INTO team_players (team_id, player_id) VALUES (?, ?)", (cpu_league_team_id, pid))
+                club_updates.append((cpu_club['id'], pid))
+            # If the club_id lookup fails, team_players alone still puts the
+            # player on the correct team in the league
+            swap_inserts.append((cpu_league_team_id, pid))
+
+        moved_ids = offered_players + requested_players
+        if club_updates:
+            cur.executemany("UPDATE players SET club_id = ? WHERE id = ?", club_updates)
+        cur.execute(f"DELETE FROM team_players WHERE player_id IN ({','.join('?' * len(moved_ids))})", moved_ids)
+        cur.executemany("INSERT OR IGNORE INTO team_players (team_id, player_id) VALUES (?, ?)", swap_inserts)
         
         # Compose a clear confirmation message
         def get_player_name(pid):
@@ -2170,10 +2261,7 @@ def confirm_transfer_with_cpu(player_id):
                             -cash_paid)
             
             # Update CPU team budget (legacy system for CPU teams)
-            cur.execute("SELECT budget FROM league_teams WHERE id = ?", (cpu_league_team_id,))
-            cpu_budget = cur.fetchone()['budget']
-            new_cpu_budget = cpu_budget + cash_paid
-            cur.execute("UPDATE league_teams SET budget = ? WHERE id = ?", (new_cpu_budget, cpu_league_team_id))
+            cur.execute("UPDATE league_teams SET budget = budget + ? WHERE id = ?", (cash_paid, cpu_league_team_id))
         
         summary = f"Transfer complete! {offered_names} joined {user_team_name}."
         if requested_players:
@@ -2209,6 +2297,24 @@ def confirm_transfer_with_cpu(player_id):
         cur.close()
         return jsonify({'error': f'Error confirming transfer: {str(e)}'}), 500
 
+# Offer-count tiers for sell_player: (market value floor, age cap, salary cap,
+# offers). Rows are checked top-down and the first match wins; a table instead
+# of an if/elif ladder so a future bulk-offer pass can reuse the same data.
+SELL_OFFER_TIERS = (
+    (20000000, 25, 5000000, 7),
+    (10000000, 28, 8000000, 5),
+    (5000000, 30, None, 3),
+    (2000000, None, None, 2),
+)
+
+def _n_sell_offers(market_value, age, salary):
+    for mv_floor, age_cap, salary_cap, offers in SELL_OFFER_TIERS:
+        if market_value >= mv_floor \
+                and (age_cap is None or age <= age_cap) \
+                and (salary_cap is None or salary < salary_cap):
+            return offers
+    return 1
+
 @app.route('/sell_player/<int:player_id>', methods=['POST'])
 @login_required
 def sell_player(player_id):
@@ -2220,7 +2326,7 @@ def sell_player(player_id):
     
     # Fetch player info
     cur = db_helper.get_cursor()
-    cur.execute("SELECT * FROM players WHERE id = ?", (player_id,))
+    cur.execute("SELECT id, player_name, market_value, salary, age FROM players WHERE id = ?", (player_id,))
     player = cur.fetchone()
     if not player:
         cur.close()
@@ -2243,18 +2349,9 @@ def sell_player(player_id):
     if not cpu_clubs:
         cur.close()
         return jsonify({'error': 'No CPU clubs available.'}), 400
-    # Determine number of offers (1-7) based on value/age/salary
-    n_offers = 1
-    if market_value >= 20000000 and age <= 25 and salary < 5000000:
-        n_offers = 7
-    elif market_value >= 10000000 and age <= 28 and salary < 8000000:
-        n_offers = 5
-    elif market_value >= 5000000 and age <= 30:
-        n_offers = 3
-    elif market_value >= 2000000:
-        n_offers = 2
+    # Determine number of offers (1-7) from the precomputed tier table
+    n_offers = _n_sell_offers(market_value, age, salary)
     n_offers = min(n_offers, len(cpu_clubs))
-    import random
     offer_teams = random.sample(cpu_clubs, n_offers)
     proposals = []
     for idx, cpu_team in enumerate(offer_teams):
@@ -2374,16 +2471,14 @@ def download_my_team_csv(team_id):
         WHERE tp.team_id = ?
         ORDER BY p.player_name ASC
     """, (team_id,))
-    players = cur.fetchall()
-    cur.close()
-    # Generate CSV
+    # Generate CSV. sqlite3.Row is sequence-like and the SELECT column order
+    # matches the header, so the cursor can be piped straight into writerows
+    # without per-cell dict lookups.
     si = StringIO()
     writer = csv.writer(si)
     writer.writerow(['ID', 'Player Name', 'Position', 'Age', 'Nationality', 'Salary', 'Contract Years', 'Market Value'])
-    for p in players:
-        writer.writerow([
-            p['id'], p['player_name'], p['registered_position'], p['age'], p['nationality'], p['salary'], p['contract_years_remaining'], p['market_value']
-        ])
+    writer.writerows(cur)
+    cur.close()
     output = si.getvalue()
     si.close()
     return Response(
@@ -2466,10 +2561,7 @@ def accept_sell_offer(player_id):
                             cash)
             
             # Update CPU team budget (legacy system for CPU teams)
-            cur.execute("SELECT budget FROM league_teams WHERE id = ?", (cpu_team_id,))
-            cpu_budget = cur.fetchone()['budget']
-            new_cpu_budget = cpu_budget - cash
-            cur.execute("UPDATE league_teams SET budget = ? WHERE id = ?", (new_cpu_budget, cpu_team_id))
+            cur.execute("UPDATE league_teams SET budget = budget - ? WHERE id = ?", (cash, cpu_team_id))
             
             if cash > 0:
                 asset_changes.append(f"✅ €{cash:,} received")
@@ -2627,14 +2719,13 @@ def confirm_sell_offer(offer_id):
                         offer['offer_amount'])
         asset_changes.append(f"✅ €{offer['offer_amount']:,} received")
     
-    # Update CPU team budget (legacy system for CPU teams)
-    cur.execute("SELECT budget FROM league_teams WHERE id = ?", (cpu_team_id,))
-    cpu_budget = cur.fetchone()['budget']
+    # Update CPU team budget (legacy system for CPU teams). Delta arithmetic
+    # in the UPDATE itself: no read round-trip and atomic under concurrency.
     if 'offered_money' in offer and 'requested_money' in offer:
-        new_cpu_budget = cpu_budget - offer['offered_money'] + offer['requested_money']
+        cpu_delta = offer['requested_money'] - offer['offered_money']
     else:
-        new_cpu_budget = cpu_budget - offer['offer_amount']
-    cur.execute("UPDATE league_teams SET budget = ? WHERE id = ?", (new_cpu_budget, cpu_team_id))
+        cpu_delta = -offer['offer_amount']
+    cur.execute("UPDATE league_teams SET budget = budget + ? WHERE id = ?", (cpu_delta, cpu_team_id))
     cur.execute("UPDATE offers SET status = 'accepted' WHERE id = ?", (offer_id,))
     
     # Post news about the CPU transfer
@@ -2769,14 +2860,11 @@ def confirm_buy_offer(offer_id):
         asset_changes.append(f"❌ €{offer['offer_amount']:,} paid")
     
     # Update CPU team budget (legacy system for CPU teams)
-    cur.execute("SELECT budget FROM league_teams WHERE id = ?", (cpu_team_id,))
-    cpu_budget = cur.fetchone()['budget']
     if 'offered_money' in offer and 'requested_money' in offer:
-        new_cpu_budget = cpu_budget + offer['offered_money'] - offer['requested_money']
+        cpu_delta = offer['offered_money'] - offer['requested_money']
     else:
-        new_cpu_budget = cpu_budget + offer['offer_amount']
-    cur.execute("UPDATE league_teams SET budget = ? WHERE id = ?", (new_cpu_budget, cpu_team_id))
-    cur.execute("UPDATE league_teams SET budget = ? WHERE id = ?", (new_cpu_budget, cpu_team_id))
+        cpu_delta = offer['offer_amount']
+    cur.execute("UPDATE league_teams SET budget = budget + ? WHERE id = ?", (cpu_delta, cpu_team_id))
     cur.execute("UPDATE offers SET status = 'accepted' WHERE id = ?", (offer_id,))
     db_helper.commit()
     cur.close()
@@ -2938,16 +3026,20 @@ def post_transfer_news(title, content, user_id=1):
     """
     Post transfer news to the blog.
     user_id=1 is the CPU user, used for system-generated news.
+
+    Runs inside the caller's transaction: every caller commits after the
+    rest of its work, so the news INSERT lands atomically with the offer
+    or transfer it describes instead of in a second commit of its own.
     """
     cur = db_helper.get_cursor()
     try:
         cur.execute("INSERT INTO posts (user_id, title, content, media_type, media_path, created_at) VALUES (?, ?, ?, 'none', NULL, ?)",
                     (user_id, title, content, datetime.now().isoformat()))
-        db_helper.commit()
+        cache.delete_memoized(get_recent_posts)
+        cache.delete_memoized(get_posts_page)
         app.logger.info(f"Transfer news posted: {title}")
         print(f"✅ Blog post created: {title}")  # Debug line
     except Exception as e:
-        db_helper.get_connection().rollback()
         app.logger.error(f"Error posting transfer news: {e}")
         print(f"❌ Error creating blog post: {e}")  # Debug line
     finally:
@@ -3381,9 +3473,8 @@ def pay_current_salary_bill():
             payments_processed += 1
             print(f"  - {user['username']}: Salary bill paid (€{total_salary:,} for {player_count} players)")
         
-        db_helper.commit()
-        
         # Create a summary blog post if multiple users were processed
+        # (posted before the commit so the summary row is covered by it)
         if payments_processed > 1:
             summary_title = f"🏦 League-Wide Salary Bill Processing Complete"
             summary_content = f"""
@@ -3394,7 +3485,9 @@ def pay_current_salary_bill():
             """
             post_transfer_news(summary_title, summary_content, user_id=1)
             print(f"📊 Summary blog post created for {payments_processed} users")
-        
+
+        db_helper.commit()
+
         flash(f'Salary bills processed! {payments_processed} users had their salary bills deducted and blog posts created.', 'success')
         
     except Exception as e:
@@ -3463,6 +3556,10 @@ if __name__ == '__main__':
     # For local development
     # app.run(debug=True)
 
-    # For production with Waitress (if you decide to use it manually)
+    # For production with Waitress (if you decide to use it manually).
+    # 16 worker threads let slow requests (PBKDF2 logins, CSV exports)
+    # overlap instead of queueing behind waitress's default of 4; SQLite
+    # handles the concurrent readers fine in combination with the
+    # connection pool in db_helper.
     from waitress import serve
-    serve(app, host='0.0.0.0', port=5000)
+    serve(app, host='0.0.0.0', port=5000, threads=16)
@@ -274,6 +274,16 @@ CREATE TABLE IF NOT EXISTS user_movements (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Indexes matching the hot lookup predicates (transfers, squad pages, CSV export)
+CREATE INDEX IF NOT EXISTS idx_team_players_player ON team_players(player_id);
+CREATE INDEX IF NOT EXISTS idx_league_teams_user ON league_teams(user_id);
+CREATE INDEX IF NOT EXISTS idx_players_club ON players(club_id);
+
+-- Ordered-scan indexes for the blog listings: the front page and blog do
+-- ORDER BY created_at DESC (with LIMIT), view_post reads comments per post
+CREATE INDEX IF NOT EXISTS idx_posts_created ON posts(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_comments_post_created ON comments(post_id, created_at);
+
 -- Example queries (remove or comment out if not needed)
 -- SELECT * FROM league_teams WHERE user_id = 1;
 -- SELECT id FROM players;
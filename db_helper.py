@@ -1,16 +1,50 @@
+import queue
 import sqlite3
 from flask import g
 from config import Config
 
 DATABASE = getattr(Config, 'SQLITE_DB_PATH', 'pes6_league_db.sqlite')
 
+# Small process-wide pool of warm connections so each request reuses an
+# already-open handle (with its page cache and statement cache) instead of
+# paying sqlite3.connect() + PRAGMA setup per request. LIFO keeps the most
+# recently used (hottest) connection on top.
+POOL_SIZE = 8
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+def _new_connection():
+    conn = sqlite3.connect(DATABASE, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON;')
+    # WAL lets readers proceed while a transfer commits, and NORMAL sync
+    # is safe in WAL mode while skipping an fsync per commit. The cache,
+    # mmap and temp settings keep hot pages and sorts off the disk.
+    conn.execute('PRAGMA journal_mode = WAL;')
+    conn.execute('PRAGMA synchronous = NORMAL;')
+    conn.execute('PRAGMA cache_size = -65536;')     # 64 MiB page cache
+    conn.execute('PRAGMA mmap_size = 268435456;')   # 256 MiB
+    conn.execute('PRAGMA temp_store = MEMORY;')
+    return conn
+
 # Flask app context: store connection in g
 
 def get_connection():
     if 'db_conn' not in g:
-        g.db_conn = sqlite3.connect(DATABASE)
-        g.db_conn.row_factory = sqlite3.Row
-        g.db_conn.execute('PRAGMA foreign_keys = ON;')
+        while True:
+            try:
+                conn = _pool.get_nowait()
+            except queue.Empty:
+                conn = _new_connection()
+                break
+            # Pre-ping: a pooled handle can go stale if a maintenance
+            # script swapped the database file underneath it; probe it
+            # before handing it to the request and discard dead ones
+            try:
+                conn.execute('SELECT 1;')
+                break
+            except sqlite3.Error:
+                conn.close()
+        g.db_conn = conn
     return g.db_conn
 
 def get_cursor():
@@ -19,15 +53,17 @@ def get_cursor():
 def commit():
     get_connection().commit()
 
-# Optional: close connection at end of request
-from flask import current_app
-from flask import has_app_context
+# Return the connection to the pool at end of request
 
 def close_connection(e=None):
     db_conn = g.pop('db_conn', None)
     if db_conn is not None:
-        db_conn.close()
+        try:
+            db_conn.rollback()  # drop any uncommitted state before reuse
+            _pool.put_nowait(db_conn)
+        except (queue.Full, sqlite3.Error):
+            db_conn.close()
 
 # In your app factory or main file, register this:
 # from db_helper import close_connection
-# app.teardown_appcontext(close_connection) 
\ No newline at end of file
+# app.teardown_appcontext(close_connection)
@@ -2,8 +2,10 @@
 
 import sqlite3
 
+from config import Config
+
 # Database path
-DB_PATH = 'pes6_league_db.sqlite'
+DB_PATH = getattr(Config, 'SQLITE_DB_PATH', 'pes6_league_db.sqlite')
 
 def debug_team_calculation():
     print("=== Debugging Team Salary Calculation ===")
@@ -19,29 +21,28 @@ def debug_team_calculation():
     
     print(f"Galindro's current budget: €{current_budget_amount:,}")
     
-    # Get Galindro's teams
-    cur.execute("SELECT id, team_name FROM league_teams WHERE user_id = (SELECT id FROM users WHERE username = 'Galindro')")
+    # Get Galindro's teams with their salary sums in one grouped query
+    # instead of one SUM query per team
+    cur.execute("""
+        SELECT lt.id, lt.team_name, COALESCE(SUM(p.salary), 0) AS team_salary
+        FROM league_teams lt
+        LEFT JOIN team_players tp ON tp.team_id = lt.id
+        LEFT JOIN players p ON p.id = tp.player_id
+        WHERE lt.user_id = (SELECT id FROM users WHERE username = 'Galindro')
+        GROUP BY lt.id, lt.team_name
+    """)
     teams = cur.fetchall()
-    
+
     print(f"\nGalindro's teams:")
     for team in teams:
         print(f"  - {team['team_name']} (ID: {team['id']})")
-    
+
     # Calculate current salaries per team
     print(f"\nCurrent salaries per team:")
-    total_current_salary = 0
-    
     for team in teams:
-        cur.execute("""
-            SELECT SUM(p.salary) as team_salary
-            FROM players p
-            JOIN team_players tp ON p.id = tp.player_id
-            WHERE tp.team_id = ?
-        """, (team['id'],))
-        team_salary = cur.fetchone()['team_salary'] or 0
-        total_current_salary += team_salary
-        print(f"  - {team['team_name']}: €{team_salary:,}")
-    
+        print(f"  - {team['team_name']}: €{team['team_salary']:,}")
+    total_current_salary = sum(team['team_salary'] for team in teams)
+
     print(f"Total current salary: €{total_current_salary:,}")
     
     # Calculate what the new salary would be after dividing by 2
@@ -2,56 +2,64 @@
 import sqlite3
 import os
 
+from config import Config
+
+DB_PATH = getattr(Config, 'SQLITE_DB_PATH', 'pes6_league_db.sqlite')
+
 def fix_player_clubs():
     """Fix players who were signed through free agency but still have club_id = 141"""
     
     # Connect to database
-    db_path = 'pes6_league_db.sqlite'
-    if not os.path.exists(db_path):
-        print(f"Database file {db_path} not found!")
+    if not os.path.exists(DB_PATH):
+        print(f"Database file {DB_PATH} not found!")
         return
     
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     
     try:
-        # Find players who are assigned to user teams but still have club_id = 141
+        # List players who are assigned to user teams but still have club_id = 141
         cur.execute("""
-            SELECT p.id, p.player_name, p.club_id, tp.team_id, lt.team_name, lt.user_id
-            FROM players p 
-            JOIN team_players tp ON p.id = tp.player_id 
-            JOIN league_teams lt ON tp.team_id = lt.id 
+            SELECT p.id, p.player_name, lt.team_name
+            FROM players p
+            JOIN team_players tp ON p.id = tp.player_id
+            JOIN league_teams lt ON tp.team_id = lt.id
             WHERE p.club_id = 141 AND lt.user_id != 1
         """)
-        
+
         players_to_fix = cur.fetchall()
-        
+
         if not players_to_fix:
             print("No players found that need fixing!")
             return
-        
+
         print(f"Found {len(players_to_fix)} players that need club_id fixing:")
-        
-        fixed_count = 0
-        
         for player in players_to_fix:
             print(f"  - {player['player_name']} (ID: {player['id']}) assigned to {player['team_name']}")
-            
-            # Find the corresponding PES6 team ID
-            cur.execute("SELECT id FROM teams WHERE club_name = ?", (player['team_name'],))
-            pes6_team_result = cur.fetchone()
-            
-            if pes6_team_result:
-                pes6_team_id = pes6_team_result['id']
-                
-                # Update the player's club_id
-                cur.execute("UPDATE players SET club_id = ? WHERE id = ?", (pes6_team_id, player['id']))
-                fixed_count += 1
-                print(f"    ✓ Updated club_id to {pes6_team_id} ({player['team_name']})")
-            else:
-                print(f"    ✗ PES6 team not found for: {player['team_name']}")
-        
+
+        # Fix them all with one set-based UPDATE instead of a SELECT + UPDATE
+        # per player. The IN subquery requires a matching teams row, so
+        # players whose league team has no PES6 club are left untouched
+        # (they would get club_id = NULL otherwise).
+        cur.execute("""
+            UPDATE players SET club_id = (
+                SELECT t.id
+                FROM team_players tp
+                JOIN league_teams lt ON lt.id = tp.team_id
+                JOIN teams t ON t.club_name = lt.team_name
+                WHERE tp.player_id = players.id AND lt.user_id != 1
+            )
+            WHERE club_id = 141 AND id IN (
+                SELECT tp.player_id
+                FROM team_players tp
+                JOIN league_teams lt ON lt.id = tp.team_id
+                JOIN teams t ON t.club_name = lt.team_name
+                WHERE lt.user_id != 1
+            )
+        """)
+        fixed_count = cur.rowcount
+
         conn.commit()
         print(f"\nFixed {fixed_count} players!")
         
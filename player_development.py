@@ -0,0 +1,703 @@
+import contextlib
+import enum
+import functools
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from player_financials import (
+    DB_PATH,
+    FREE_AGENT_CLUB_ID,
+    GLOBAL_BASE_SALARY,
+    NUMERIC_SKILL_COLUMNS,
+    SEED_VALUE,
+)
+
+# Development profiles control how a player's skills drift season over
+# season: when they grow, when they plateau and how hard they decline.
+# Rarity values are relative sampling weights, not probabilities.
+DEVELOPMENT_PROFILES = {
+    0: {'name': 'Early Bloomer',    'rarity': 20, 'peak_start': 21, 'peak_end': 26, 'growth': 1.4, 'decline': 1.0},
+    1: {'name': 'Standard',         'rarity': 30, 'peak_start': 24, 'peak_end': 29, 'growth': 1.0, 'decline': 1.0},
+    2: {'name': 'Late Bloomer',     'rarity': 10, 'peak_start': 27, 'peak_end': 31, 'growth': 0.8, 'decline': 0.7},
+    3: {'name': 'Steady Climber',   'rarity': 20, 'peak_start': 25, 'peak_end': 30, 'growth': 0.9, 'decline': 0.8},
+    4: {'name': 'Explosive Talent', 'rarity': 5,  'peak_start': 20, 'peak_end': 24, 'growth': 1.8, 'decline': 1.3},
+    5: {'name': 'Wonderkid',        'rarity': 2,  'peak_start': 19, 'peak_end': 27, 'growth': 2.0, 'decline': 0.9},
+    6: {'name': 'Journeyman',       'rarity': 20, 'peak_start': 23, 'peak_end': 28, 'growth': 0.7, 'decline': 0.9},
+    7: {'name': 'Evergreen',        'rarity': 5,  'peak_start': 26, 'peak_end': 33, 'growth': 0.9, 'decline': 0.4},
+    8: {'name': 'Flash in the Pan', 'rarity': 10, 'peak_start': 19, 'peak_end': 22, 'growth': 1.6, 'decline': 1.6},
+    9: {'name': 'Slow Burner',      'rarity': 10, 'peak_start': 28, 'peak_end': 32, 'growth': 0.6, 'decline': 0.6},
+}
+
+# Trait 2 boosts the shooting skills, trait 3 the physical ones; the rest
+# are flavour-only for now.
+DEVELOPMENT_TRAITS = {
+    0: {'name': 'None',              'rarity': 60},
+    1: {'name': 'Consistent',        'rarity': 20},
+    2: {'name': 'Deadly Finisher',   'rarity': 12},
+    3: {'name': 'Physical Specimen', 'rarity': 8},
+}
+
+SHOOTING_TRAIT_SKILLS = ('shot_accuracy', 'shot_power', 'shot_technique', 'free_kick_accuracy')
+PHYSICAL_TRAIT_SKILLS = ('top_speed', 'acceleration', 'stamina', 'jump', 'balance')
+TRAIT_SKILL_BOOST = 1.5
+
+# One multiplier row per trait, aligned to NUMERIC_SKILL_COLUMNS, so trait
+# effects become a single gather + multiply instead of per-call dict copies.
+_TRAIT_MATRIX = np.ones((len(DEVELOPMENT_TRAITS), len(NUMERIC_SKILL_COLUMNS)), dtype=np.float32)
+_TRAIT_MATRIX[2, [NUMERIC_SKILL_COLUMNS.index(s) for s in SHOOTING_TRAIT_SKILLS]] = TRAIT_SKILL_BOOST
+_TRAIT_MATRIX[3, [NUMERIC_SKILL_COLUMNS.index(s) for s in PHYSICAL_TRAIT_SKILLS]] = TRAIT_SKILL_BOOST
+
+# Mixed development key layout (32 bits):
+#   bit 31      mixed flag
+#   bits 24-27  profile index 2
+#   bits 20-23  profile index 1
+#   bits 16-19  profile index 0
+#   bits  8-15  weight 1 as integer percent
+#   bits  0-7   weight 0 as integer percent  (weight 2 = remainder)
+# A key without the mixed flag is a plain profile index.
+MIXED_KEY_FLAG = 0x80000000
+
+MAX_AGE = 50
+
+# Skills each position leans on during development; everything else gets a
+# neutral weight. Matched on the position string prefix.
+POSITION_SKILL_FOCUS = {
+    'GK': ('goal_keeping', 'response', 'jump', 'mentality'),
+    'CB': ('defense', 'heading', 'balance', 'aggression', 'response'),
+    'SB': ('defense', 'stamina', 'top_speed', 'short_pass_accuracy'),
+    'WB': ('stamina', 'top_speed', 'dribble_speed', 'long_pass_accuracy'),
+    'DM': ('defense', 'short_pass_accuracy', 'team_work', 'stamina'),
+    'CM': ('short_pass_accuracy', 'long_pass_accuracy', 'technique', 'team_work'),
+    'SM': ('dribble_accuracy', 'dribble_speed', 'top_speed', 'swerve'),
+    'AM': ('technique', 'short_pass_accuracy', 'shot_technique', 'agility'),
+    'WF': ('top_speed', 'dribble_speed', 'shot_accuracy', 'acceleration'),
+    'SS': ('shot_accuracy', 'shot_technique', 'agility', 'technique'),
+    'CF': ('attack', 'shot_accuracy', 'shot_power', 'heading'),
+}
+FOCUS_SKILL_WEIGHT = 1.5
+
+_RNG = np.random.default_rng(SEED_VALUE)
+
+# Structure-of-arrays views over the profile/trait tables, built once at
+# import: contiguous rarity/weight arrays for the sampling paths (a binary
+# search or weighted choice instead of dict-of-dict probes per draw) and
+# plain name lists for display.
+_PROFILE_KEYS = np.array(list(DEVELOPMENT_PROFILES), dtype=np.int32)
+_PROFILE_NAMES = [DEVELOPMENT_PROFILES[p]['name'] for p in DEVELOPMENT_PROFILES]
+_PROFILE_RARITY = np.array(
+    [DEVELOPMENT_PROFILES[p]['rarity'] for p in DEVELOPMENT_PROFILES], dtype=np.float32)
+_PROFILE_WEIGHTS = _PROFILE_RARITY.astype(np.float64) / _PROFILE_RARITY.sum()
+_PROFILE_CUMWEIGHTS = np.cumsum(_PROFILE_WEIGHTS)
+_TRAIT_KEYS = np.array(list(DEVELOPMENT_TRAITS), dtype=np.int32)
+_TRAIT_NAMES = [DEVELOPMENT_TRAITS[t]['name'] for t in DEVELOPMENT_TRAITS]
+_TRAIT_RARITY = np.array(
+    [DEVELOPMENT_TRAITS[t]['rarity'] for t in DEVELOPMENT_TRAITS], dtype=np.float32)
+_TRAIT_CUMWEIGHTS = np.cumsum(_TRAIT_RARITY).astype(np.float64)
+_TRAIT_CUMWEIGHTS /= _TRAIT_CUMWEIGHTS[-1]
+
+
+def encode_mixed_development_key(profiles, weights):
+    """Pack up to three profile indexes and their weights into one 32-bit key."""
+    if len(profiles) == 1:
+        return int(profiles[0])
+    key = MIXED_KEY_FLAG
+    key |= (int(profiles[0]) & 0xF) << 16
+    key |= (int(profiles[1]) & 0xF) << 20
+    key |= (int(profiles[2]) & 0xF) << 24
+    key |= int(round(weights[0] * 100)) & 0xFF
+    key |= (int(round(weights[1] * 100)) & 0xFF) << 8
+    return key
+
+
+@functools.lru_cache(maxsize=65536)
+def decode_mixed_development_key(key):
+    """Unpack a development key into (profile_indexes, weights) tuples."""
+    key = int(key)
+    if not key & MIXED_KEY_FLAG:
+        return (key & 0xF,), (1.0,)
+    p0 = (key >> 16) & 0xF
+    p1 = (key >> 20) & 0xF
+    p2 = (key >> 24) & 0xF
+    w0 = (key & 0xFF) / 100.0
+    w1 = ((key >> 8) & 0xFF) / 100.0
+    w2 = max(0.0, 1.0 - w0 - w1)
+    return (p0, p1, p2), (w0, w1, w2)
+
+
+def _age_multiplier_scalar(age, profile_type):
+    """Reference age-curve evaluation; only used to fill _AGE_MULT_TABLE."""
+    profile = DEVELOPMENT_PROFILES[profile_type]
+    peak_start = profile['peak_start']
+    peak_end = profile['peak_end']
+    if age < peak_start:
+        return profile['growth'] * (peak_start - age) / max(1, peak_start - 15)
+    if age <= peak_end:
+        return 0.1
+    return -profile['decline'] * (age - peak_end) / 10.0
+
+
+# Value-modifier lookup tables indexed by current rating: growth slows as a
+# rating climbs, decline is softened at the bottom of the scale. One gather
+# replaces the tier comparison ladder per skill.
+VMOD_UP = np.ones(100, dtype=np.float32)
+VMOD_UP[75:85] = 0.9
+VMOD_UP[85:90] = 0.7
+VMOD_UP[90:95] = 0.5
+VMOD_UP[95:] = 0.3
+VMOD_DOWN = np.ones(100, dtype=np.float32)
+VMOD_DOWN[:50] = 0.5
+VMOD_DOWN[50:60] = 0.8
+
+# One multiplier per (profile, age) precomputed at import so the hot path is
+# a single table load instead of a branch chain over the profile curves.
+_AGE_MULT_TABLE = np.empty((len(DEVELOPMENT_PROFILES), MAX_AGE + 1), dtype=np.float32)
+for _p in DEVELOPMENT_PROFILES:
+    for _a in range(MAX_AGE + 1):
+        _AGE_MULT_TABLE[_p, _a] = _age_multiplier_scalar(_a, _p)
+
+
+def get_age_development_multiplier(age, profile_type):
+    """Return the development multiplier for a player age and profile."""
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        age = 25
+    return float(_AGE_MULT_TABLE[int(profile_type), min(max(age, 0), MAX_AGE)])
+
+
+def generate_mixed_development_key():
+    """Generate a key blending three distinct development profiles."""
+    # Sampling without replacement kills the redraw-until-distinct loop the
+    # rarity-weighted random.choices version needed.
+    picked = _RNG.choice(_PROFILE_KEYS, size=3, replace=False, p=_PROFILE_WEIGHTS)
+    w0 = int(_RNG.integers(40, 71))
+    w1 = int(_RNG.integers(10, 100 - w0 - 9))
+    return encode_mixed_development_key(picked, (w0 / 100.0, w1 / 100.0, (100 - w0 - w1) / 100.0))
+
+
+def generate_complete_development_key():
+    """Generate a development key; most players get a single profile."""
+    if _RNG.random() < 0.7:
+        return int(_PROFILE_KEYS[np.searchsorted(_PROFILE_CUMWEIGHTS, _RNG.random())])
+    return generate_mixed_development_key()
+
+
+def generate_trait_key():
+    """Pick a development trait index weighted by rarity."""
+    return int(_TRAIT_KEYS[np.searchsorted(_TRAIT_CUMWEIGHTS, _RNG.random())])
+
+
+def get_position_skill_weights(position):
+    """Return the per-skill development weights for a position string."""
+    weights = {skill: 1.0 for skill in NUMERIC_SKILL_COLUMNS}
+    pos = str(position or '').strip().upper()
+    for prefix, focus_skills in POSITION_SKILL_FOCUS.items():
+        if pos.startswith(prefix) or prefix in pos:
+            for skill in focus_skills:
+                weights[skill] = FOCUS_SKILL_WEIGHT
+            break
+    return weights
+
+
+# Fixed development skill order plus a position -> ready weight vector
+# cache: one dict hit hands back a float32 array aligned to this order
+# instead of 28 .get calls against a freshly built dict.
+SKILL_COLUMNS_DEV = tuple(NUMERIC_SKILL_COLUMNS)
+_POS_WEIGHT_CACHE = {}
+
+
+def get_position_weight_vector(position):
+    """Development weights for a position as an array in SKILL_COLUMNS_DEV order."""
+    pos = str(position or '').strip().upper()
+    vec = _POS_WEIGHT_CACHE.get(pos)
+    if vec is None:
+        weights = get_position_skill_weights(position)
+        vec = np.array([weights[s] for s in SKILL_COLUMNS_DEV], dtype=np.float32)
+        _POS_WEIGHT_CACHE[pos] = vec
+    return vec
+
+
+def apply_development_trait_effects(skill_weights, trait_key):
+    """Apply a trait's skill boosts on top of the base development weights."""
+    if trait_key == 2:
+        boosted = skill_weights.copy()
+        for skill in SHOOTING_TRAIT_SKILLS:
+            if skill in boosted:
+                boosted[skill] *= TRAIT_SKILL_BOOST
+        return boosted
+    if trait_key == 3:
+        boosted = skill_weights.copy()
+        for skill in PHYSICAL_TRAIT_SKILLS:
+            if skill in boosted:
+                boosted[skill] *= TRAIT_SKILL_BOOST
+        return boosted
+    return skill_weights
+
+
+def apply_development_trait_effects_vec(weights, trait_types):
+    """Vectorized trait application: one matrix gather and one multiply."""
+    return weights * _TRAIT_MATRIX[np.asarray(trait_types, dtype=np.intp)]
+
+
+def calculate_performance_boost(games_played, goals, assists):
+    """Turn last season's stats into a small development boost."""
+    try:
+        games = float(games_played or 0)
+        goals = float(goals or 0)
+        assists = float(assists or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    boost = 0.0
+    if games >= 20:
+        boost += 0.1
+    if games > 0:
+        boost += min(0.3, (goals / games) * 0.5)
+        boost += min(0.2, (assists / games) * 0.4)
+    return round(boost, 3)
+
+
+def calculate_performance_boost_batch(games_played, goals, assists):
+    """Vectorized calculate_performance_boost over whole-roster arrays."""
+    games = np.nan_to_num(np.asarray(games_played, dtype=np.float64))
+    goals = np.nan_to_num(np.asarray(goals, dtype=np.float64))
+    assists = np.nan_to_num(np.asarray(assists, dtype=np.float64))
+    boost = np.where(games >= 20, 0.1, 0.0)
+    played = games > 0
+    safe_games = np.where(played, games, 1.0)
+    boost += np.where(played, np.minimum(0.3, goals / safe_games * 0.5), 0.0)
+    boost += np.where(played, np.minimum(0.2, assists / safe_games * 0.4), 0.0)
+    return boost.round(3)
+
+
+# Which skills each performance stat feeds, as fixed index tables into
+# SKILL_COLUMNS_DEV — boosts are scattered with one indexed add instead of
+# string matching per skill.
+IDX_GOALS = np.array([NUMERIC_SKILL_COLUMNS.index(s) for s in
+                      ('attack', 'shot_accuracy', 'shot_power', 'shot_technique')])
+IDX_ASSISTS = np.array([NUMERIC_SKILL_COLUMNS.index(s) for s in
+                        ('short_pass_accuracy', 'long_pass_accuracy', 'technique', 'team_work')])
+IDX_GAMES = np.array([NUMERIC_SKILL_COLUMNS.index(s) for s in
+                      ('stamina', 'condition_fitness', 'consistency', 'mentality')])
+
+
+def build_performance_boost_vector(games_played, goals, assists):
+    """Per-skill performance boosts as an array in SKILL_COLUMNS_DEV order."""
+    perf_vec = np.zeros(len(NUMERIC_SKILL_COLUMNS))
+    try:
+        games = float(games_played or 0)
+        goals = float(goals or 0)
+        assists = float(assists or 0)
+    except (TypeError, ValueError):
+        return perf_vec
+    if games >= 20:
+        perf_vec[IDX_GAMES] += 0.1
+    if games > 0:
+        if goals > 0:
+            perf_vec[IDX_GOALS] += min(0.3, goals / games * 0.5)
+        if assists > 0:
+            perf_vec[IDX_ASSISTS] += min(0.2, assists / games * 0.4)
+    return perf_vec
+
+
+def calculate_player_skill_development(player_row, development_key, trait_key):
+    """Compute the per-skill development weight for a single player."""
+    profiles, weights = decode_mixed_development_key(development_key)
+    try:
+        age = int(player_row.get('age') or 25)
+    except (TypeError, ValueError):
+        age = 25
+    age = min(max(age, 0), MAX_AGE)
+    age_mult = sum(float(_AGE_MULT_TABLE[p, age]) * w for p, w in zip(profiles, weights))
+    random_factor = float(_RNG.uniform(0.75, 1.25))
+    final_mult = age_mult * random_factor
+    vec = get_position_weight_vector(player_row.get('registered_position')).astype(np.float64)
+    if trait_key in (2, 3):
+        vec = vec * _TRAIT_MATRIX[trait_key]
+    return dict(zip(SKILL_COLUMNS_DEV, vec * final_mult))
+
+
+def calculate_player_skill_development_batch(player_df, profile_keys, trait_keys):
+    """Compute development weights for a whole frame of players at once.
+
+    Returns an (n_players, n_skills) float array aligned to
+    NUMERIC_SKILL_COLUMNS; row i matches what
+    calculate_player_skill_development would produce for player i.
+    """
+    keys = np.ascontiguousarray(profile_keys, dtype=np.uint32)
+    n = keys.size
+
+    # Decode every key in one pass with bit-shift ufuncs instead of the
+    # per-player Python decode.
+    mixed = (keys & MIXED_KEY_FLAG) != 0
+    p0 = np.where(mixed, (keys >> 16) & 0xF, keys & 0xF).astype(np.intp)
+    p1 = ((keys >> 20) & 0xF).astype(np.intp)
+    p2 = ((keys >> 24) & 0xF).astype(np.intp)
+    w0 = np.where(mixed, (keys & 0xFF) / 100.0, 1.0)
+    w1 = np.where(mixed, ((keys >> 8) & 0xFF) / 100.0, 0.0)
+    w2 = np.where(mixed, np.maximum(0.0, 1.0 - w0 - w1), 0.0)
+
+    ages = pd.to_numeric(player_df['age'], errors='coerce').fillna(25).to_numpy()
+    ages = np.clip(ages.astype(np.intp), 0, MAX_AGE)
+
+    # Gather the age multipliers straight out of the precomputed table.
+    age_mult = (_AGE_MULT_TABLE[p0, ages] * w0
+                + _AGE_MULT_TABLE[p1, ages] * w1
+                + _AGE_MULT_TABLE[p2, ages] * w2)
+    final_mult = age_mult * _RNG.uniform(0.75, 1.25, size=n)
+
+    # One weight vector per distinct position, gathered per player.
+    # fillna first: factorize would hand NaN positions code -1, which
+    # fancy-indexes the *last* row of the weight matrix.
+    pos_codes, pos_uniques = pd.factorize(
+        player_df['registered_position'].fillna('').astype(str), sort=False)
+    pos_matrix = np.array(
+        [get_position_weight_vector(pos) for pos in pos_uniques], dtype=np.float32)
+    weights = pos_matrix[pos_codes].astype(np.float64)
+
+    weights = apply_development_trait_effects_vec(weights, trait_keys)
+
+    return weights * final_mult[:, None]
+
+
+def _coerce_skill_value(value):
+    """Current skill rating as an int, defaulting junk values to 50."""
+    try:
+        return int(value or 50)
+    except (TypeError, ValueError):
+        return 50
+
+
+def _dev_kernel(cur, weights, perf_vec, rnd, out_new,
+                vmod_up=VMOD_UP, vmod_down=VMOD_DOWN):
+    """Straight-line per-skill loop: one pass, no per-op dispatch.
+
+    At 28 skills the fixed dispatch cost of chaining NumPy ufuncs exceeds
+    the arithmetic, so the kernel is a fused scalar loop with its lookup
+    tables bound as locals — the same shape numba's @njit would compile
+    unchanged if it ever becomes a dependency.
+    """
+    for i in range(cur.size):
+        c = cur[i]
+        if c < 0:
+            c = 0
+        elif c > 99:
+            c = 99
+        base = weights[i]
+        if base > 0.0:
+            base += perf_vec[i]
+        vm = vmod_up[c] if base > 0.0 else vmod_down[c]
+        new = round(c + base * vm * rnd[i])
+        out_new[i] = 1 if new < 1 else (99 if new > 99 else new)
+    return out_new
+
+
+# One record per skill, in NUMERIC_SKILL_COLUMNS order — five packed fields
+# instead of 28 five-key dicts, so counting improvements/declines is a single
+# vectorized comparison on arr['change'].
+SKILL_CHANGE_DTYPE = np.dtype([
+    ('current', np.int16),
+    ('change', np.int8),
+    ('new', np.int16),
+    ('weight', np.float32),
+    ('perf_boost', np.float32),
+])
+
+
+def skill_changes_as_dict(changes):
+    """Expand a SKILL_CHANGE_DTYPE array into the legacy dict-of-dicts shape."""
+    return {
+        skill: {
+            'current': int(rec['current']),
+            'change': int(rec['change']),
+            'new': int(rec['new']),
+            'weight': float(rec['weight']),
+            'perf_boost': float(rec['perf_boost']),
+        }
+        for skill, rec in zip(NUMERIC_SKILL_COLUMNS, changes)
+    }
+
+
+def develop_player(player_row, development_key, trait_key, games_played=0, goals=0, assists=0):
+    """Run one development season for a player and return the skill changes.
+
+    Returns a SKILL_CHANGE_DTYPE structured array aligned with
+    NUMERIC_SKILL_COLUMNS; use skill_changes_as_dict for the old per-skill
+    dict shape.
+    """
+    dev_weights = calculate_player_skill_development(player_row, development_key, trait_key)
+    perf_vec = build_performance_boost_vector(games_played, goals, assists)
+
+    n = len(NUMERIC_SKILL_COLUMNS)
+    cur = np.fromiter((_coerce_skill_value(player_row.get(s)) for s in NUMERIC_SKILL_COLUMNS),
+                      dtype=np.int16, count=n)
+    weights = np.fromiter((dev_weights.get(s, 0.0) for s in NUMERIC_SKILL_COLUMNS),
+                          dtype=np.float64, count=n)
+    new_values = _dev_kernel(cur, weights, perf_vec,
+                             _RNG.uniform(0.7, 1.3, size=n), np.empty(n, dtype=np.int64))
+
+    changes = np.empty(n, dtype=SKILL_CHANGE_DTYPE)
+    changes['current'] = cur
+    changes['new'] = new_values
+    changes['change'] = (new_values - cur).astype(np.int8)
+    changes['weight'] = weights
+    changes['perf_boost'] = perf_vec
+    return changes
+
+
+def build_performance_boost_matrix(games_played, goals, assists):
+    """(n_players, n_skills) performance boosts, one vector row per player."""
+    games = np.nan_to_num(np.asarray(games_played, dtype=np.float64))
+    goals = np.nan_to_num(np.asarray(goals, dtype=np.float64))
+    assists = np.nan_to_num(np.asarray(assists, dtype=np.float64))
+    perf = np.zeros((games.size, len(NUMERIC_SKILL_COLUMNS)))
+    played = games > 0
+    safe_games = np.where(played, games, 1.0)
+    perf[:, IDX_GAMES] += np.where(games >= 20, 0.1, 0.0)[:, None]
+    perf[:, IDX_GOALS] += np.where(
+        played, np.minimum(0.3, goals / safe_games * 0.5), 0.0)[:, None]
+    perf[:, IDX_ASSISTS] += np.where(
+        played, np.minimum(0.2, assists / safe_games * 0.4), 0.0)[:, None]
+    return perf
+
+
+_SQL_DEVELOP_PLAYERS = (
+    "UPDATE players SET "
+    + ", ".join(f"{col} = ?" for col in SKILL_COLUMNS_DEV)
+    + " WHERE id = ?"
+)
+
+
+def develop_players(player_df, games_played=None, goals=None, assists=None,
+                    db_path=DB_PATH):
+    """Run one development season for every player in player_df at once.
+
+    player_df needs id, age, registered_position, development_key and
+    trait_key plus the skill columns (assign_development_keys_to_players
+    fills the keys). Season stat arrays default to zero since the players
+    table carries no per-season stats. At n_players×28 skills the matrix
+    is big enough that whole-roster ufuncs win, unlike the 28-element
+    scalar kernel in develop_player. New ratings are written back into
+    player_df and the database in one executemany; returns the player
+    count, 0 on error.
+    """
+    try:
+        n = len(player_df)
+        if n == 0:
+            return 0
+        zeros = np.zeros(n)
+        games = zeros if games_played is None else games_played
+        goals = zeros if goals is None else goals
+        assists = zeros if assists is None else assists
+
+        dev_keys = pd.to_numeric(player_df['development_key'], errors='coerce') \
+            .fillna(0).to_numpy(dtype=np.int64)
+        trait_keys = pd.to_numeric(player_df['trait_key'], errors='coerce') \
+            .fillna(0).to_numpy(dtype=np.int64)
+        weights = calculate_player_skill_development_batch(player_df, dev_keys, trait_keys)
+        perf = build_performance_boost_matrix(games, goals, assists)
+
+        # Same model as _dev_kernel, spelled as whole-matrix ufuncs.
+        vals = player_df[list(SKILL_COLUMNS_DEV)].to_numpy(dtype=np.float64)
+        vals = np.where(np.isnan(vals) | (vals == 0), 50.0, vals)
+        cur = np.clip(vals, 0, 99).astype(np.intp)
+        base = np.where(weights > 0.0, weights + perf, weights)
+        vmod = np.where(base > 0.0, VMOD_UP[cur], VMOD_DOWN[cur])
+        rnd = _RNG.uniform(0.7, 1.3, size=(n, len(SKILL_COLUMNS_DEV)))
+        new_mat = np.clip(np.rint(cur + base * vmod * rnd), 1, 99).astype(np.int16)
+
+        player_df.loc[:, list(SKILL_COLUMNS_DEV)] = new_mat
+        ids = player_df['id'].tolist()
+        rows = [tuple(skill_row) + (pid,)
+                for skill_row, pid in zip(new_mat.tolist(), ids)]
+        with contextlib.closing(sqlite3.connect(db_path)) as conn, conn:
+            conn.execute('PRAGMA journal_mode = WAL;')
+            conn.execute('PRAGMA synchronous = NORMAL;')
+            conn.executemany(_SQL_DEVELOP_PLAYERS, rows)
+        improved = int(((new_mat - cur) > 0).any(axis=1).sum())
+        print(f"Developed {n} players ({improved} improved at least one skill)")
+        return n
+    except Exception as e:
+        print(f"Error developing players: {e}")
+        return 0
+
+
+class RetirementReason(enum.IntEnum):
+    """Why a player hung up his boots; formatted lazily on display."""
+    NONE = 0
+    NO_CLUB = 1
+    LONG_CAREER = 2
+    AGE = 3
+
+
+# Salary at which the "big contract keeps you playing" cushion saturates;
+# hoisted so scalar and bulk retirement checks share one precomputed value.
+_SAL_CUSHION_MAX = GLOBAL_BASE_SALARY * 15.0
+
+
+_RETIREMENT_TEMPLATES = {
+    RetirementReason.NO_CLUB: "retired at {age} after failing to find a club",
+    RetirementReason.LONG_CAREER: "retired at {age} at the end of a long career",
+    RetirementReason.AGE: "retired at {age}",
+}
+
+
+def format_retirement_reason(reason_code, reason_args):
+    """Render a retirement reason code plus its args into display text."""
+    template = _RETIREMENT_TEMPLATES.get(reason_code)
+    return template.format(**reason_args) if template else None
+
+
+def check_player_retirement(player_row):
+    """Decide whether a player retires; returns (retires, reason_code, reason_args).
+
+    The reason stays as a code plus argument dict so bulk sweeps don't
+    allocate a formatted string per player — callers that need prose run
+    the result through format_retirement_reason.
+    """
+    try:
+        age = float(player_row.get('age') or 25)
+    except (TypeError, ValueError):
+        age = 25.0
+    try:
+        salary = float(player_row.get('salary') or GLOBAL_BASE_SALARY)
+    except (TypeError, ValueError):
+        salary = float(GLOBAL_BASE_SALARY)
+    club_id = player_row.get('club_id')
+    is_free_agent = club_id is None or club_id == FREE_AGENT_CLUB_ID
+
+    age_prob = min(0.8, min(max((age - 30.0) / 13.0, 0.0), 1.0) * 0.75)
+    salary_norm = min(1.0, salary / _SAL_CUSHION_MAX)
+    club_factor = 0.25 if is_free_agent else 0.0
+    final_prob = min(max(age_prob + club_factor - (1.0 - salary_norm) * 0.3, 0.0), 1.0)
+    if _RNG.random() < final_prob:
+        if is_free_agent:
+            code = RetirementReason.NO_CLUB
+        elif age >= 36:
+            code = RetirementReason.LONG_CAREER
+        else:
+            code = RetirementReason.AGE
+        return True, code, {'age': int(age)}
+    return False, RetirementReason.NONE, {}
+
+
+def check_players_retirement_bulk(df):
+    """Season-end retirement screening for a whole frame of players.
+
+    Returns (retires, reason_codes) arrays aligned to df rows; reason
+    codes are RetirementReason values, NONE where the player stays on.
+    Same model as check_player_retirement, evaluated as column ops with
+    one random draw for everybody.
+    """
+    ages = pd.to_numeric(df['age'], errors='coerce').fillna(25.0).to_numpy(dtype=np.float64)
+    salaries = pd.to_numeric(df['salary'], errors='coerce').fillna(
+        float(GLOBAL_BASE_SALARY)).to_numpy(dtype=np.float64)
+    free_agent = ((df['club_id'] == FREE_AGENT_CLUB_ID) | df['club_id'].isna()).to_numpy()
+
+    age_prob = np.minimum(0.8, np.clip((ages - 30.0) / 13.0, 0.0, 1.0) * 0.75)
+    salary_norm = np.minimum(1.0, salaries / _SAL_CUSHION_MAX)
+    club_factor = np.where(free_agent, 0.25, 0.0)
+    final_prob = np.clip(age_prob + club_factor - (1.0 - salary_norm) * 0.3, 0.0, 1.0)
+
+    retires = _RNG.random(len(ages)) < final_prob
+    codes = np.select(
+        [~retires, free_agent, ages >= 36],
+        [int(RetirementReason.NONE), int(RetirementReason.NO_CLUB),
+         int(RetirementReason.LONG_CAREER)],
+        default=int(RetirementReason.AGE),
+    )
+    return retires, codes
+
+
+def generate_development_keys_batch(n):
+    """Generate n development keys and n trait keys as integer arrays."""
+    keys = np.empty(n, dtype=np.int64)
+
+    # ~70% single profile via one vectorized searchsorted.
+    mixed = _RNG.random(n) >= 0.7
+    n_single = int(n - mixed.sum())
+    keys[~mixed] = _PROFILE_KEYS[
+        np.searchsorted(_PROFILE_CUMWEIGHTS, _RNG.random(n_single))]
+
+    # Mixed rows: three distinct rarity-weighted profiles per row via the
+    # Gumbel-top-k trick (argpartition of perturbed log-weights), then the
+    # weights and the bit-packing as pure array ops.
+    m = int(mixed.sum())
+    if m:
+        scores = np.log(_PROFILE_WEIGHTS) + _RNG.gumbel(size=(m, _PROFILE_KEYS.size))
+        picks = np.argpartition(-scores, 3, axis=1)[:, :3]
+        w0 = _RNG.integers(40, 71, size=m)
+        w1 = _RNG.integers(10, 91 - w0)
+        keys[mixed] = (MIXED_KEY_FLAG
+                       | (picks[:, 0] << 16) | (picks[:, 1] << 20) | (picks[:, 2] << 24)
+                       | w0 | (w1 << 8))
+
+    traits = _TRAIT_KEYS[np.searchsorted(_TRAIT_CUMWEIGHTS, _RNG.random(n))]
+    return keys, traits.astype(np.int64)
+
+
+# Single shared SQL text so every executemany run hits the same prepared
+# statement in sqlite3's statement cache instead of re-parsing per call.
+_SQL_ASSIGN_KEYS = "UPDATE players SET development_key = ?, trait_key = ? WHERE id = ?"
+
+
+def assign_development_keys_to_players(db_path=DB_PATH):
+    """Assign development and trait keys to every player missing them."""
+    try:
+        with contextlib.closing(sqlite3.connect(db_path)) as conn, conn:
+            cur = conn.cursor()
+            cur.execute("PRAGMA table_info(players)")
+            existing = {row[1] for row in cur.fetchall()}
+            if 'development_key' not in existing:
+                cur.execute("ALTER TABLE players ADD COLUMN development_key INTEGER")
+            if 'trait_key' not in existing:
+                cur.execute("ALTER TABLE players ADD COLUMN trait_key INTEGER")
+
+            cur.execute("SELECT id FROM players WHERE development_key IS NULL")
+            player_ids = [row[0] for row in cur.fetchall()]
+            if player_ids:
+                keys, traits = generate_development_keys_batch(len(player_ids))
+                cur.executemany(
+                    _SQL_ASSIGN_KEYS,
+                    zip(keys.tolist(), traits.tolist(), player_ids),
+                )
+            print(f"Assigned development keys to {len(player_ids)} players")
+            return len(player_ids)
+    except Exception as e:
+        print(f"Error assigning development keys: {e}")
+        return 0
+
+
+def verify_development_keys(db_path=DB_PATH):
+    """Print a quick sanity report on the stored development keys."""
+    try:
+        with contextlib.closing(sqlite3.connect(db_path)) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM players WHERE development_key IS NULL")
+            missing = cur.fetchone()[0]
+            cur.execute(
+                "SELECT COUNT(*) FROM players WHERE development_key >= ?", (MIXED_KEY_FLAG,)
+            )
+            mixed = cur.fetchone()[0]
+            cur.execute(
+                "SELECT player_name, development_key, trait_key FROM players "
+                "WHERE development_key IS NOT NULL LIMIT 5"
+            )
+            print(f"Players without development key: {missing}")
+            print(f"Players with mixed profiles: {mixed}")
+            for name, dev_key, trait_key in cur.fetchall():
+                profiles, weights = decode_mixed_development_key(dev_key)
+                names = [_PROFILE_NAMES[p] for p in profiles]
+                trait = _TRAIT_NAMES[trait_key] if trait_key is not None and 0 <= trait_key < len(_TRAIT_NAMES) else '?'
+                print(f"  {name}: {list(zip(names, weights))} / trait {trait}")
+            return missing == 0
+    except Exception as e:
+        print(f"Error verifying development keys: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    assign_development_keys_to_players()
+    verify_development_keys()
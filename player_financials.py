@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+"""Player financials engine: salaries, market values, contracts and wage raises.
+
+Salaries are derived from the full skill sheet weighted by how important each
+skill is for the player's registered position (position averages act as the
+importance profile). Market value is salary-driven with an age curve on top.
+"""
+
+import contextlib
+import functools
+import math
+import os
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+
+DB_PATH = getattr(Config, 'SQLITE_DB_PATH', 'pes6_league_db.sqlite')
+
+SEED_VALUE = 42
+
+# Salary model constants. Skills between R_START and R_END ramp their
+# multiplier geometrically from MIN_MULT up to MAX_MULT; NORM is the neutral
+# position-average used when a position profile is missing.
+GLOBAL_BASE_SALARY = 300000
+R_START = 60.0
+R_END = 95.0
+MIN_MULT = 0.5
+MAX_MULT = 4.0
+NORM = 70.0
+DEF_NAME = 'defense'
+GK_NAME = 'goal_keeping'
+DEF_BOOST = 1.15
+GK_BOOST = 1.20
+BIN_IMPACT = 0.35
+SALARY_DIV = 1000.0
+SALARY_POW = 3.37
+SALARY_SCALER = 90000.0
+# exp(log(ratio) * prog) computes the geometric ramp with one exp instead of
+# a generic pow; the ratio is loop-invariant.
+_LOG_RATIO = math.log(MAX_MULT / MIN_MULT)
+
+# Free agents live under this pseudo-club and carry no market value.
+FREE_AGENT_CLUB_ID = 141
+
+# The 0-99 rated skills plus the 0/1 special-ability flags, in DB column order.
+NUMERIC_SKILL_COLUMNS = (
+    'attack', 'defense', 'balance', 'stamina', 'top_speed', 'acceleration',
+    'response', 'agility', 'dribble_accuracy', 'dribble_speed',
+    'short_pass_accuracy', 'short_pass_speed', 'long_pass_accuracy',
+    'long_pass_speed', 'shot_accuracy', 'shot_power', 'shot_technique',
+    'free_kick_accuracy', 'swerve', 'heading', 'jump', 'technique',
+    'aggression', 'mentality', 'goal_keeping', 'team_work', 'consistency',
+    'condition_fitness',
+)
+SPECIAL_SKILL_COLUMNS = (
+    'dribbling_skill', 'tactical_dribble', 'positioning', 'reaction',
+    'playmaking', 'passing', 'scoring', 'one_one_scoring', 'post_player',
+    'lines', 'middle_shooting', 'side', 'centre', 'penalties',
+    'one_touch_pass', 'outside', 'marking', 'sliding', 'covering',
+    'd_line_control', 'penalty_stopper', 'one_on_one_stopper', 'long_throw',
+)
+SKILL_COLUMNS = NUMERIC_SKILL_COLUMNS + SPECIAL_SKILL_COLUMNS
+
+
+_RE_NON_WORD = re.compile(r'[^\w\s-]')
+_RE_DASH_SPACE = re.compile(r'[-\s]+')
+
+
+@functools.lru_cache(maxsize=1024)
+def clean_sql_col_name(col_name):
+    """Turn a CSV header like 'SHOT ACCURACY' into a SQL column name.
+
+    Header names repeat across every schema pass, so repeat calls are a
+    cache hit rather than two regex substitutions.
+    """
+    s = str(col_name).strip().lower()
+    s = _RE_NON_WORD.sub('', s)
+    s = _RE_DASH_SPACE.sub('_', s)
+    return s
+
+
+def identify_true_skill_columns(df, non_skill_cols):
+    """Return the columns of df that hold mostly-numeric skill data."""
+    cand_cols = [
+        col for col in df.columns
+        if col not in non_skill_cols and not pd.api.types.is_bool_dtype(df[col])
+    ]
+    if not cand_cols:
+        return []
+    # One block-wise coercion and a single 2-D NA count instead of a
+    # per-column isna().mean() pass. Already-numeric columns pass through
+    # to_numeric unchanged, so the block apply covers both cases.
+    conv = df[cand_cols].apply(pd.to_numeric, errors='coerce')
+    na_counts = conv.isna().to_numpy().sum(axis=0)
+    keep = na_counts < 0.5 * len(df)
+    return [col for col, k in zip(cand_cols, keep) if k]
+
+
+def identify_binary_skills(df, skill_cols_list):
+    """Return the subset of skill columns that only ever hold 0/1 flags."""
+    cols = [col for col in skill_cols_list if col in df.columns]
+    if not cols:
+        return []
+    # One 2-D scan over the whole block: a column is binary when every cell
+    # is 0, 1 or NaN and at least one cell is not NaN.
+    arr = df[cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+    nan_mask = np.isnan(arr)
+    is_binary = (((arr == 0) | (arr == 1) | nan_mask).all(axis=0)
+                 & ~nan_mask.all(axis=0))
+    return [col for col, b in zip(cols, is_binary) if b]
+
+
+def analyze_skill_averages_by_position(df, current_skill_columns):
+    """Average each skill column per 'REGISTERED POSITION' of a CSV frame."""
+    # Sort-then-reduce instead of pandas groupby: factorize the positions,
+    # stable-sort the value matrix by group code, and reduce each contiguous
+    # run with np.add.reduceat. One sequential scan per aggregate, and the
+    # result matrix stays C-contiguous (groupby.mean hands back an
+    # F-contiguous block that hurts later row access).
+    valid_cols = [c for c in current_skill_columns if c in df.columns]
+    # Only the skill columns are materialized — never a full-frame copy —
+    # and already-numeric columns are referenced as-is instead of coerced.
+    coerced = {
+        col: df[col] if pd.api.types.is_numeric_dtype(df[col])
+        else pd.to_numeric(df[col], errors='coerce')
+        for col in valid_cols
+    }
+    vals = pd.DataFrame(coerced, copy=False).to_numpy(dtype=np.float64)
+
+    codes, uniques = pd.factorize(df['REGISTERED POSITION'], sort=False)
+    known = codes >= 0  # factorize marks NaN keys as -1; groupby dropped them
+    vals = vals[known]
+    codes = codes[known]
+    if codes.size == 0:
+        return pd.DataFrame(columns=valid_cols)
+
+    order = np.argsort(codes, kind='stable')
+    codes_s = codes[order]
+    vals_s = vals[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(codes_s)) + 1]
+
+    nan_mask = np.isnan(vals_s)
+    sums = np.add.reduceat(np.where(nan_mask, 0.0, vals_s), starts, axis=0)
+    counts = np.add.reduceat((~nan_mask).astype(np.float64), starts, axis=0)
+    means = sums / np.where(counts == 0, np.nan, counts)
+    return pd.DataFrame(np.ascontiguousarray(means),
+                        index=pd.Index(uniques[codes_s[starts]], name='__pos__'),
+                        columns=valid_cols)
+
+
+_SKILL_DTYPES = {c: np.float32 for c in SKILL_COLUMNS}
+
+# Everything the financials pipeline actually reads per player — the skill
+# sheet plus the few descriptive fields — so updaters never pay for the
+# full 100+-column rows of SELECT *.
+SKILL_SELECT = ', '.join(SKILL_COLUMNS)
+FINANCIALS_COLUMNS = ('id', 'age', 'club_id', 'registered_position') + SKILL_COLUMNS
+
+
+def load_players_df(db_path=DB_PATH, columns=None, where=None):
+    """Load players with the skill columns already typed float32.
+
+    Centralizing the read means downstream coercion passes see numeric
+    dtypes and fall through their fast paths instead of re-running
+    to_numeric per function.
+    """
+    select = '*' if columns is None else ', '.join(columns)
+    query = f"SELECT {select} FROM players"
+    if where:
+        query += f" WHERE {where}"
+    dtypes = {c: t for c, t in _SKILL_DTYPES.items()
+              if columns is None or c in columns}
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        return pd.read_sql_query(query, conn, dtype=dtypes)
+
+
+def calculate_position_averages_from_db(db_path=DB_PATH):
+    """Average each skill per registered_position over the real clubs."""
+    conn = sqlite3.connect(db_path)
+    # Let SQLite do the GROUP BY: it computes the ~51 AVG() aggregates in C
+    # in a single table scan and hands back one row per position, so Python
+    # never sees the full table at all.
+    avg_cols = ', '.join(f"AVG({c}) AS {c}" for c in SKILL_COLUMNS)
+    df = pd.read_sql_query(
+        f"SELECT registered_position, {avg_cols} "
+        f"FROM players WHERE club_id != {FREE_AGENT_CLUB_ID} "
+        f"GROUP BY registered_position",
+        conn, index_col='registered_position',
+    )
+    conn.close()
+    # float32 is plenty for averages of 0-99 integer skills and halves the
+    # memory traffic of every salary multiply that reuses this frame.
+    return df.astype(np.float32)
+
+
+# Position averages only change when the database file does, so cache the
+# computed frame keyed on (path, mtime). DataFrames aren't hashable, which
+# rules out functools.lru_cache — a module dict does the same job.
+_pos_avg_cache = {}
+
+
+def get_cached_position_averages(db_path=DB_PATH):
+    """calculate_position_averages_from_db, recomputed only when the DB changes."""
+    key = (db_path, os.path.getmtime(db_path))
+    if key not in _pos_avg_cache:
+        _pos_avg_cache.clear()
+        _pos_avg_cache[key] = calculate_position_averages_from_db(db_path)
+    return _pos_avg_cache[key]
+
+
+# A single player's row can't tell a binary flag from a skill that happens
+# to be 0 or 1, so binary-skill membership is a table-level property. The
+# mtime in the cache key keeps results fresh across DB rewrites while
+# lru_cache handles the memoization and eviction.
+@functools.lru_cache(maxsize=4)
+def _cached_binary_skills(skill_cols, db_path, mtime):
+    conn = sqlite3.connect(db_path)
+    sample = pd.read_sql_query(
+        f"SELECT {', '.join(skill_cols)} FROM players LIMIT 500", conn,
+        dtype={c: 'float32' for c in skill_cols})
+    conn.close()
+    return identify_binary_skills(sample, list(skill_cols))
+
+
+def get_cached_binary_skills(db_path=DB_PATH, skill_cols=SKILL_COLUMNS):
+    """Binary-skill column list for the table, recomputed when the DB changes."""
+    return _cached_binary_skills(tuple(skill_cols), db_path, os.path.getmtime(db_path))
+
+
+def _salary_kernel(vals, pos_avg, boost, bin_mask,
+                   _nan=math.isnan, _exp=math.exp,
+                   R_START=R_START, R_END=R_END, MIN_MULT=MIN_MULT,
+                   MAX_MULT=MAX_MULT, NORM=NORM, BIN_IMPACT=BIN_IMPACT,
+                   _LOG_RATIO=_LOG_RATIO):
+    """Raw (unrounded) salary from aligned float64/bool arrays.
+
+    Straight-line numeric loop over preconverted arrays — no dict or Series
+    access inside, and every constant bound as a local so the loop does no
+    global loads. Kept njit-compatible on purpose: where numba is available
+    this is the function to decorate (the constants then become compile-time
+    literals).
+    """
+    twss = 0.0
+    for i in range(vals.shape[0]):
+        val = vals[i]
+        if _nan(val):
+            continue
+        if val >= R_END:
+            mult = MAX_MULT
+        elif val > R_START:
+            prog = (val - R_START) / (R_END - R_START)
+            mult = MIN_MULT * _exp(_LOG_RATIO * prog)
+        else:
+            mult = MIN_MULT
+        if bin_mask[i]:
+            twss += val * BIN_IMPACT * mult
+        else:
+            twss += val * mult * (pos_avg[i] / NORM) * boost[i]
+    return math.pow(max(0.0, twss / SALARY_DIV), SALARY_POW) * SALARY_SCALER
+
+
+# Position averages as one (positions x skills) matrix plus O(1) index
+# dicts, keyed on the identity of the source frame (frames come from
+# get_cached_position_averages, so identity is stable). The matrix carries
+# an extra all-NORM row at index -1, so an unknown position resolves via
+# pos_index.get(pos, -1) without a branch.
+_pos_avg_array_cache = {}
+
+
+def _position_average_arrays(pos_avg_df, skills):
+    key = (id(pos_avg_df), skills)
+    cached = _pos_avg_array_cache.get(key)
+    if cached is None or cached[0] is not pos_avg_df:
+        base = pos_avg_df.reindex(columns=list(skills)).fillna(NORM).to_numpy(dtype=np.float32)
+        arr = np.ascontiguousarray(
+            np.vstack([base, np.full((1, len(skills)), NORM, dtype=np.float32)]))
+        pos_index = {str(p): i for i, p in enumerate(pos_avg_df.index)}
+        skill_index = {s: j for j, s in enumerate(skills)}
+        cached = (pos_avg_df, arr, pos_index, skill_index)
+        _pos_avg_array_cache.clear()
+        _pos_avg_array_cache[key] = cached
+    return cached[1], cached[2], cached[3]
+
+
+def get_cached_position_averages_np(db_path=DB_PATH, skills=SKILL_COLUMNS):
+    """(matrix, position->row, skill->col) view of the cached position averages."""
+    return _position_average_arrays(get_cached_position_averages(db_path), tuple(skills))
+
+
+# Boost vector and binary mask depend only on the (skills, binaries) pair,
+# so build them once per combination instead of per player.
+_skill_weight_cache = {}
+
+
+def _skill_weight_arrays(skills, binaries):
+    key = (skills, tuple(binaries))
+    cached = _skill_weight_cache.get(key)
+    if cached is None:
+        boost = np.ones(len(skills))
+        if DEF_NAME in skills:
+            boost[skills.index(DEF_NAME)] = DEF_BOOST
+        if GK_NAME in skills:
+            boost[skills.index(GK_NAME)] = GK_BOOST
+        bin_mask = np.isin(skills, list(binaries))
+        cached = (boost, bin_mask)
+        _skill_weight_cache[key] = cached
+    return cached
+
+
+def _extract_skill_values(player_row, skills):
+    """Skill ratings from a mapping as a float array in the given order."""
+    return np.fromiter(
+        (float(v) if v is not None else np.nan
+         for v in (player_row.get(s) for s in skills)),
+        dtype=np.float64, count=len(skills),
+    )
+
+
+def _salary_from_values(vals, pos_clean, pos_avg_df, skills, binaries):
+    """Salary kernel entry for callers that already hold the value array."""
+    if pos_avg_df is not None:
+        arr, pos_index, _ = _position_average_arrays(pos_avg_df, skills)
+        pos_avg = arr[pos_index.get(pos_clean, -1)]
+    else:
+        pos_avg = np.full(len(skills), NORM)
+    boost, bin_mask = _skill_weight_arrays(skills, binaries)
+    salary = _salary_kernel(vals, pos_avg, boost, bin_mask)
+    return max(GLOBAL_BASE_SALARY, round(salary / 1000.0) * 1000.0)
+
+
+def calculate_player_salary_base(player_row, pos_avg_df, skills, binaries):
+    """Base salary for one player (any Mapping, e.g. a plain dict) from his skills."""
+    skills = tuple(skills)
+    return _salary_from_values(
+        _extract_skill_values(player_row, skills),
+        str(player_row.get('registered_position', '')),
+        pos_avg_df, skills, binaries)
+
+
+def calculate_player_salaries_batch(df, pos_avg_df, skills, binaries):
+    """Base salaries for every row of df in one vectorized pass.
+
+    Same model as calculate_player_salary_base, but computed over the whole
+    (players x skills) matrix at once so NumPy does the pow/multiply loops
+    instead of the interpreter.
+    """
+    skills = list(skills)
+    skill_df = df[skills]
+    # Straight to_numpy when the block is already numeric (the read_sql
+    # path); only CSV-sourced object columns pay for the coercion.
+    if all(pd.api.types.is_numeric_dtype(t) for t in skill_df.dtypes):
+        S = skill_df.to_numpy(dtype=np.float64)
+    else:
+        S = skill_df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+    # Position-importance matrix aligned row-for-row with df; unknown
+    # positions fall back to the neutral NORM profile.
+    positions = df['registered_position'].astype(str)
+    P = (
+        pos_avg_df.reindex(positions)[skills]
+        .fillna(NORM)
+        .to_numpy(dtype=np.float64)
+    )
+
+    prog = np.clip((S - R_START) / (R_END - R_START), 0.0, 1.0)
+    mult = np.where(
+        S >= R_END, MAX_MULT,
+        np.where(S > R_START, MIN_MULT * np.exp(_LOG_RATIO * prog), MIN_MULT),
+    )
+
+    contrib = S * mult * (P / NORM)
+
+    # DEF/GK boosts as a per-column vector, binary flags flattened to their
+    # fixed-impact form.
+    boost_vec, bin_mask = _skill_weight_arrays(tuple(skills), binaries)
+    contrib *= boost_vec
+    contrib[:, bin_mask] = S[:, bin_mask] * BIN_IMPACT * mult[:, bin_mask]
+
+    twss = np.nansum(contrib, axis=1)
+    salaries = np.power(np.maximum(0.0, twss / SALARY_DIV), SALARY_POW) * SALARY_SCALER
+    return np.maximum(GLOBAL_BASE_SALARY, np.round(salaries / 1000.0) * 1000.0)
+
+
+def get_age_market_value_multiplier(age):
+    """Age curve for market value: peak young, flat at 29, decaying to 40."""
+    y_fact = 1.3
+    p_fact = 1.0
+    o_fact = 0.4
+    if age is None or (isinstance(age, float) and math.isnan(age)):
+        return 1.0
+    age = float(age)
+    if age <= 16:
+        return y_fact
+    if age < 29:
+        return p_fact + (y_fact - p_fact) * math.pow(1 - (age - 16) / 13.0, 1.5)
+    if age == 29:
+        return p_fact
+    if age < 40:
+        return o_fact + (p_fact - o_fact) * math.pow(1 - (age - 29) / 11.0, 3.0)
+    return o_fact
+
+
+def get_age_market_value_multiplier_vec(ages):
+    """get_age_market_value_multiplier over a whole age vector at once."""
+    y_fact = 1.3
+    p_fact = 1.0
+    o_fact = 0.4
+    ages = np.asarray(ages, dtype=np.float64)
+    nan_mask = np.isnan(ages)
+    safe = np.where(nan_mask, 29.0, ages)
+    # np.select over full-vector value arrays: unlike np.piecewise this
+    # evaluates each branch as one ufunc pass instead of calling Python
+    # lambdas on gathered sub-arrays.
+    rising = p_fact + (y_fact - p_fact) * np.power(
+        np.clip(1 - (safe - 16) / 13.0, 0.0, 1.0), 1.5)
+    falling = o_fact + (p_fact - o_fact) * np.power(
+        np.clip(1 - (safe - 29) / 11.0, 0.0, 1.0), 3.0)
+    out = np.select(
+        [safe <= 16, safe < 29, safe == 29, safe < 40],
+        [y_fact, rising, p_fact, falling],
+        default=o_fact,
+    )
+    out[nan_mask] = 1.0
+    return out
+
+
+# Ages in the DB are whole years, so the curve collapses to a lookup table:
+# one clipped gather per roster instead of re-evaluating both power branches.
+_AGE_MV_LUT = np.array([get_age_market_value_multiplier(a) for a in range(120)],
+                       dtype=np.float32)
+
+
+def get_age_market_value_multiplier_lut(ages):
+    """LUT-backed age multiplier for integer age vectors; NaN maps to 1.0."""
+    ages = np.asarray(ages, dtype=np.float64)
+    nan_mask = np.isnan(ages)
+    idx = np.clip(np.where(nan_mask, 0, ages), 0, _AGE_MV_LUT.size - 1).astype(np.intp)
+    out = _AGE_MV_LUT[idx].astype(np.float64)
+    out[nan_mask] = 1.0
+    return out
+
+
+# One PCG64 generator for every draw, scalar and batched alike, so the whole
+# module shares a single seeded stream (PCG64 is also markedly faster than
+# the random module's Mersenne Twister).
+_rng = np.random.default_rng(SEED_VALUE)
+
+
+def apply_random_salary_adjustment(base_salary):
+    """Jitter a base salary by +/-20%, floored at the league minimum."""
+    factor = float(_rng.uniform(-0.20, 0.20))
+    adjusted = max(GLOBAL_BASE_SALARY, base_salary * (1.0 + factor))
+    return round(adjusted / 1000.0) * 1000.0
+
+
+def apply_random_salary_adjustment_batch(base_salaries):
+    """apply_random_salary_adjustment over a whole salary vector."""
+    factors = _rng.uniform(-0.20, 0.20, size=base_salaries.shape)
+    adjusted = np.maximum(GLOBAL_BASE_SALARY, base_salaries * (1.0 + factors))
+    return (np.rint(adjusted / 1000.0) * 1000.0).astype(np.int64)
+
+
+def apply_market_value_adjustment(value):
+    """Jitter a market value by -15%/+25% to model demand."""
+    factor = float(_rng.uniform(-0.15, 0.25))
+    return max(0.0, round(value * (1.0 + factor) / 1000.0) * 1000.0)
+
+
+def apply_market_value_adjustment_batch(values):
+    """apply_market_value_adjustment over a whole value vector."""
+    factors = _rng.uniform(-0.15, 0.25, size=values.shape)
+    return np.maximum(0.0, np.round(values * (1.0 + factors) / 1000.0) * 1000.0)
+
+
+def determine_contract_years(age_val):
+    """Older players get shorter contracts."""
+    try:
+        age = int(float(age_val))
+    except (TypeError, ValueError):
+        age = 25
+    if age > 32:
+        return int(_rng.integers(1, 3))
+    if age > 30:
+        return int(_rng.integers(1, 4))
+    return int(_rng.integers(2, 6))
+
+
+def determine_contract_years_batch(ages):
+    """determine_contract_years over a whole age vector (three RNG calls total)."""
+    ages = np.asarray(ages, dtype=np.float64)
+    ages = np.where(np.isnan(ages), 25, ages).astype(np.int32)
+    n = ages.shape[0]
+    # Draw exactly one value per player per bucket instead of three full-size
+    # vectors of which two thirds were thrown away.
+    m_old = ages > 32
+    m_mid = (ages > 30) & ~m_old
+    m_young = ~(m_old | m_mid)
+    out = np.empty(n, dtype=np.int32)
+    out[m_old] = _rng.integers(1, 3, size=int(m_old.sum()))
+    out[m_mid] = _rng.integers(1, 4, size=int(m_mid.sum()))
+    out[m_young] = _rng.integers(2, 6, size=int(m_young.sum()))
+    return out
+
+
+def calculate_yearly_wage_raise(player_row, num_skills, salary, avg_skill=None):
+    """Yearly wage raise fraction from age, average skill and current salary."""
+    age = player_row.get('age')
+    try:
+        age = int(float(age))
+    except (TypeError, ValueError):
+        age = 25
+    if avg_skill is None:
+        vals = [float(v) for v in (player_row.get(s) for s in num_skills)
+                if v is not None and not (isinstance(v, float) and math.isnan(v))]
+        avg_skill = float(np.mean(vals)) if vals else 60.0
+
+    if age < 24 and avg_skill >= 75:
+        raise_pct = float(_rng.uniform(0.06, 0.12))
+    elif age < 24:
+        raise_pct = float(_rng.uniform(0.04, 0.08))
+    elif age < 30 and avg_skill >= 80:
+        raise_pct = float(_rng.uniform(0.04, 0.08))
+    elif age < 30:
+        raise_pct = float(_rng.uniform(0.02, 0.05))
+    elif age < 33:
+        raise_pct = float(_rng.uniform(0.01, 0.03))
+    else:
+        raise_pct = float(_rng.uniform(0.0, 0.015))
+
+    if salary < 5 * GLOBAL_BASE_SALARY:
+        raise_pct *= 1.1
+    return round(min(raise_pct, 0.25), 3)
+
+
+def calculate_yearly_wage_raises_batch(ages, avg_skills, salaries):
+    """Vectorized calculate_yearly_wage_raise over whole-roster arrays."""
+    ages = np.asarray(ages, dtype=np.float64)
+    avg_skills = np.asarray(avg_skills, dtype=np.float64)
+    salaries = np.asarray(salaries, dtype=np.float64)
+    ages = np.where(np.isnan(ages), 25.0, ages)
+    avg_skills = np.where(np.isnan(avg_skills), 60.0, avg_skills)
+
+    # Same six brackets as the scalar decision tree, picked with np.select
+    # and filled from one uniform draw remapped per bracket.
+    conds = [
+        (ages < 24) & (avg_skills >= 75),
+        ages < 24,
+        (ages < 30) & (avg_skills >= 80),
+        ages < 30,
+        ages < 33,
+    ]
+    lo = np.select(conds, [0.06, 0.04, 0.04, 0.02, 0.01], default=0.0)
+    hi = np.select(conds, [0.12, 0.08, 0.08, 0.05, 0.03], default=0.015)
+    u = _rng.random(ages.size)
+    raise_pct = lo + (hi - lo) * u
+    raise_pct *= np.where(salaries < 5 * GLOBAL_BASE_SALARY, 1.1, 1.0)
+    return np.minimum(raise_pct, 0.25).round(3)
+
+
+def calculate_player_financials(player_data, db_path=DB_PATH):
+    """Full financial package (salary, market value, contract, raise) for one player."""
+    pos_avg_df = get_cached_position_averages(db_path)
+    binaries = get_cached_binary_skills(db_path)
+
+    # Walk the player mapping once: the same value array feeds the salary
+    # kernel and the wage-raise average instead of two extraction passes.
+    vals = _extract_skill_values(player_data, SKILL_COLUMNS)
+    base_salary = _salary_from_values(
+        vals, str(player_data.get('registered_position', '')),
+        pos_avg_df, SKILL_COLUMNS, binaries)
+    salary = apply_random_salary_adjustment(base_salary)
+    num_vals = vals[:len(NUMERIC_SKILL_COLUMNS)]
+    avg_skill = float(np.nanmean(num_vals)) if not np.isnan(num_vals).all() else 60.0
+
+    club_id = player_data.get('club_id')
+    if club_id == FREE_AGENT_CLUB_ID or club_id is None:
+        market_value = 0.0
+    else:
+        age_mult = get_age_market_value_multiplier(player_data.get('age'))
+        market_value = apply_market_value_adjustment(salary * 1.5 * age_mult)
+
+    return {
+        'salary': int(salary),
+        'market_value': int(market_value),
+        'contract_years_remaining': determine_contract_years(player_data.get('age')),
+        'yearly_wage_rise': calculate_yearly_wage_raise(
+            player_data, NUMERIC_SKILL_COLUMNS, salary, avg_skill=avg_skill),
+    }
+
+
+def calculate_player_market_value_only(player_data):
+    """Market value from an already-known salary, without touching the salary."""
+    club_id = player_data.get('club_id')
+    if club_id == FREE_AGENT_CLUB_ID or club_id is None:
+        return 0
+    salary = float(player_data.get('salary') or GLOBAL_BASE_SALARY)
+    age_mult = get_age_market_value_multiplier(player_data.get('age'))
+    return int(apply_market_value_adjustment(salary * 1.5 * age_mult))
+
+
+def _update_one_player_financials(conn, player_id, db_path):
+    """Do the single-player read/compute/write on an existing connection."""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT age, club_id, registered_position, {SKILL_SELECT} "
+        f"FROM players WHERE id = ?", (player_id,))
+    row = cursor.fetchone()
+    if row is None:
+        print(f"Player {player_id} not found!")
+        return False
+    # Row gives by-name access straight off the cursor; dict(row)
+    # converts in C without walking cursor.description ourselves.
+    fin = calculate_player_financials(dict(row), db_path)
+    cursor.execute(
+        "UPDATE players SET salary = ?, market_value = ?, "
+        "contract_years_remaining = ?, yearly_wage_rise = ? WHERE id = ?",
+        (fin['salary'], fin['market_value'], fin['contract_years_remaining'],
+         fin['yearly_wage_rise'], player_id),
+    )
+    return True
+
+
+def update_player_financials_in_db(player_id, db_path=DB_PATH, conn=None):
+    """Recompute and store one player's financials.
+
+    Pass an open `conn` to reuse it (e.g. the pooled Flask handle or a loop
+    over many players); the caller then keeps ownership of commit/close and
+    the connection's row_factory must yield mappings (sqlite3.Row).
+    """
+    try:
+        if conn is not None:
+            return _update_one_player_financials(conn, player_id, db_path)
+        # contextlib.closing guarantees the handle is released even when
+        # sqlite3.connect itself is the thing that fails (the old except
+        # block touched conn before it was bound); the inner `conn` context
+        # wraps the block in one transaction that commits or rolls back as
+        # a unit.
+        with contextlib.closing(sqlite3.connect(db_path)) as own, own:
+            own.row_factory = sqlite3.Row
+            return _update_one_player_financials(own, player_id, db_path)
+    except Exception as e:
+        print(f"Error updating player {player_id}: {e}")
+        return False
+
+
+def update_player_market_values_only(db_path=DB_PATH):
+    """Recompute market_value for every player, keeping salaries untouched."""
+    try:
+        with contextlib.closing(sqlite3.connect(db_path)) as conn, conn:
+            conn.execute('PRAGMA journal_mode = WAL;')
+            conn.execute('PRAGMA synchronous = NORMAL;')
+            df = pd.read_sql_query(
+                "SELECT id, player_name, club_id, registered_position, age, salary "
+                "FROM players", conn)
+
+            salaries = df['salary'].to_numpy(dtype=np.float64)
+            salaries = np.where(np.isnan(salaries) | (salaries <= 0),
+                                GLOBAL_BASE_SALARY, salaries)
+            age_mult = get_age_market_value_multiplier_lut(df['age'].to_numpy(dtype=np.float64))
+            # In-place multiplies: salaries is already a private buffer, so
+            # scale it rather than allocating two temporaries for the chain.
+            salaries *= 1.5
+            salaries *= age_mult
+            mv = apply_market_value_adjustment_batch(salaries)
+            free_agent = ((df['club_id'] == FREE_AGENT_CLUB_ID) | df['club_id'].isna()).to_numpy()
+            mv[free_agent] = 0
+            mv = mv.astype(np.int64)
+
+            conn.executemany("UPDATE players SET market_value = ? WHERE id = ?",
+                             zip(mv.tolist(), df['id'].tolist()))
+
+        # Top five per position via one partial-sort groupby instead of
+        # appending and fully sorting Python tuple lists per position.
+        summary = pd.DataFrame({
+            'position': df['registered_position'].astype(str),
+            'name': df['player_name'],
+            'mv': mv,
+        })
+        top5 = (summary.sort_values('mv', ascending=False)
+                .groupby('position', sort=True).head(5))
+
+        print(f"Updated market values for {len(df)} players.")
+        for pos, grp in top5.groupby('position', sort=True):
+            top = ', '.join(f"{name} (€{v:,})" for name, v in zip(grp['name'], grp['mv']))
+            print(f"  Position {pos}: {top}")
+        return True
+    except Exception as e:
+        print(f"Error updating market values: {e}")
+        return False
+
+
+def update_all_player_financials_in_db(db_path=DB_PATH):
+    """Recompute financials for the whole roster in one transaction.
+
+    One SELECT, batched array math, one executemany — the per-player
+    update_player_financials_in_db stays for single-player edits.
+    """
+    try:
+        with contextlib.closing(sqlite3.connect(db_path)) as conn, conn:
+            conn.execute('PRAGMA journal_mode = WAL;')
+            conn.execute('PRAGMA synchronous = NORMAL;')
+
+            df = load_players_df(db_path, columns=FINANCIALS_COLUMNS)
+            pos_avg_df = get_cached_position_averages(db_path)
+            binaries = identify_binary_skills(df, list(SKILL_COLUMNS))
+
+            base = calculate_player_salaries_batch(df, pos_avg_df, SKILL_COLUMNS, binaries)
+            salaries = apply_random_salary_adjustment_batch(base)
+
+            ages = df['age'].to_numpy(dtype=np.float64)
+            mv = apply_market_value_adjustment_batch(
+                salaries * 1.5 * get_age_market_value_multiplier_lut(ages))
+            free_agent = ((df['club_id'] == FREE_AGENT_CLUB_ID) | df['club_id'].isna()).to_numpy()
+            mv[free_agent] = 0
+
+            contract_years = determine_contract_years_batch(ages).tolist()
+            # Skill columns come out of load_players_df already float32.
+            avg_skills = df[list(NUMERIC_SKILL_COLUMNS)].mean(axis=1).fillna(60.0).to_numpy()
+            wage_raises = calculate_yearly_wage_raises_batch(
+                ages, avg_skills, salaries).tolist()
+
+            conn.executemany(
+                "UPDATE players SET salary = ?, market_value = ?, "
+                "contract_years_remaining = ?, yearly_wage_rise = ? WHERE id = ?",
+                zip(salaries.astype(np.int64).tolist(), mv.astype(np.int64).tolist(),
+                    contract_years, wage_raises, df['id'].tolist()),
+            )
+        print(f"Updated financials for {len(df)} players.")
+        return True
+    except Exception as e:
+        print(f"Error updating all player financials: {e}")
+        return False
+
+
+def calculate_team_financials(team_df, pos_avg_df, binary_skills):
+    """Total salary bill and market value for a frame of team players.
+
+    Takes the already-loaded squad frame plus the shared position averages
+    and binary-skill list, so a 25-player squad costs one batch salary
+    pass instead of 25 round trips through the per-player path.
+    """
+    if team_df.empty:
+        return {'players': 0, 'total_salary': 0, 'total_market_value': 0}
+    salaries = apply_random_salary_adjustment_batch(
+        calculate_player_salaries_batch(team_df, pos_avg_df, SKILL_COLUMNS, binary_skills))
+    ages = pd.to_numeric(team_df['age'], errors='coerce').to_numpy(dtype=np.float64)
+    mv = apply_market_value_adjustment_batch(
+        salaries * 1.5 * get_age_market_value_multiplier_lut(ages))
+    free_agent = ((team_df['club_id'] == FREE_AGENT_CLUB_ID)
+                  | team_df['club_id'].isna()).to_numpy()
+    mv[free_agent] = 0
+    return {
+        'players': len(team_df),
+        'total_salary': int(salaries.sum()),
+        'total_market_value': int(mv.sum()),
+    }
+
+
+def get_team_financials(team_id, db_path=DB_PATH):
+    """calculate_team_financials for one league team loaded from the DB."""
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        team_df = pd.read_sql_query(
+            "SELECT p.* FROM players p JOIN team_players tp ON tp.player_id = p.id "
+            "WHERE tp.team_id = ?",
+            conn, params=(team_id,), dtype=_SKILL_DTYPES,
+        )
+    return calculate_team_financials(
+        team_df, get_cached_position_averages(db_path), get_cached_binary_skills(db_path))
+
+
+if __name__ == "__main__":
+    update_player_market_values_only()
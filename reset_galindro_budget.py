@@ -2,8 +2,10 @@
 
 import sqlite3
 
+from config import Config
+
 # Database path
-DB_PATH = 'pes6_league_db.sqlite'
+DB_PATH = getattr(Config, 'SQLITE_DB_PATH', 'pes6_league_db.sqlite')
 
 def reset_galindro_budget():
     print("=== Resetting Galindro's Budget ===")
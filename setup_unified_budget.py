@@ -3,8 +3,10 @@
 import sqlite3
 import os
 
+from config import Config
+
 # Database path
-DB_PATH = 'pes6_league_db.sqlite'
+DB_PATH = getattr(Config, 'SQLITE_DB_PATH', 'pes6_league_db.sqlite')
 
 def setup_unified_budget():
     print("=== Setting up Unified Budget System ===")